@@ -0,0 +1,77 @@
+import constants
+
+
+# Decides which enemies run their AI in a frame, so AI cost depends on the enemies near the player.
+# Enemies are kept in square regions of the map:
+# - enemies in regions far from the player are dormant and not looked at at all,
+#   they wake up when the player gets close to their region
+# - awake enemies closer than AI_ACTIVE_RANGE run their AI every frame
+# - other awake enemies (off screen) run their AI every AI_REDUCED_INTERVAL frames (spread over the frames),
+#   they move AI_REDUCED_INTERVAL steps at once so they keep their normal speed
+# - dead enemies are removed from the regions for good
+class AIScheduler():
+    def __init__(self, enemies):
+        self.region_size = constants.AI_REGION_TILES * constants.TILE_SIZE
+        # Region (column, row) -> enemies in the region
+        self.regions = {}
+        # Enemy -> its region
+        self.enemy_regions = {}
+        # Enemy -> frame slot for the reduced rate
+        self.slots = {}
+        self.frame = 0
+        for enemy in enemies:
+            if enemy.alive:
+                self.add(enemy)
+
+    def region_at(self, x, y):
+        return x // self.region_size, y // self.region_size
+
+    def add(self, enemy):
+        region = self.region_at(*enemy.rect.center)
+        self.regions.setdefault(region, []).append(enemy)
+        self.enemy_regions[enemy] = region
+        self.slots[enemy] = len(self.slots) % constants.AI_REDUCED_INTERVAL
+
+    def remove(self, enemy):
+        region = self.enemy_regions.pop(enemy)
+        self.regions[region].remove(enemy)
+        del self.slots[enemy]
+
+    # Move the enemy to another region if it walked out of its region
+    def relocate(self, enemy):
+        region = self.enemy_regions.get(enemy)
+        if region is None:
+            return
+        new_region = self.region_at(*enemy.rect.center)
+        if new_region != region:
+            self.regions[region].remove(enemy)
+            self.regions.setdefault(new_region, []).append(enemy)
+            self.enemy_regions[enemy] = new_region
+
+    # Return the enemies that should run their AI this frame and the number of steps each of them moves
+    def scheduled(self, player):
+        self.frame += 1
+        slot = self.frame % constants.AI_REDUCED_INTERVAL
+        active_range = constants.AI_ACTIVE_RANGE ** 2
+        player_x, player_y = player.rect.center
+        region_x, region_y = self.region_at(player_x, player_y)
+        wake = constants.AI_WAKE_REGIONS
+
+        enemies = []
+        steps = []
+        dead = []
+        for x in range(region_x - wake, region_x + wake + 1):
+            for y in range(region_y - wake, region_y + wake + 1):
+                for enemy in self.regions.get((x, y), ()):
+                    if not enemy.alive:
+                        dead.append(enemy)
+                    elif (enemy.rect.centerx - player_x) ** 2 + (enemy.rect.centery - player_y) ** 2 < active_range:
+                        enemies.append(enemy)
+                        steps.append(1)
+                    elif self.slots[enemy] == slot:
+                        enemies.append(enemy)
+                        steps.append(constants.AI_REDUCED_INTERVAL)
+        # Dead enemies are still drawn, but they don't need updates anymore
+        for enemy in dead:
+            self.remove(enemy)
+        return enemies, steps
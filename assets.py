@@ -0,0 +1,225 @@
+import json
+import os
+import struct
+import threading
+import zlib
+import pygame
+import constants
+
+# All sprites can be baked into one pack file (python assets.py) that is read with a single read.
+# Each sprite group is one pre-scaled texture atlas, stored as compressed RGBA pixels.
+# Format: magic, length of the json index, the json index, then the compressed atlas of each group
+# (offsets in the index start after the index).
+# The index stores the crc32 of the image files of every group, a group whose images changed is loaded from the files
+PACK_PATH = "assets/pack/sprites.pack"
+PACK_MAGIC = b"DCAP"
+PACK_HEADER = struct.Struct("<4sI")
+ATLAS_WIDTH = 1024
+
+MOB_TYPES = ["elf", "imp", "skeleton", "goblin", "muddy", "tiny_zombie", "big_demon"]
+ANIMATION_TYPES = ["idle", "run"]
+
+
+# Scale the image by the given constant
+def scale_img(image, scale):
+    w = image.get_width()
+    h = image.get_height()
+    return pygame.transform.scale(image, (w * scale, h * scale))
+
+
+# The scale constants the sprites are baked with, a pack made with other values is not used
+def pack_settings():
+    return {"SCALE": constants.SCALE, "BUTTON_SCALE": constants.BUTTON_SCALE, "ITEM_SCALE": constants.ITEM_SCALE,
+            "WEAPON_SCALE": constants.WEAPON_SCALE, "POTION_SCALE": constants.POTION_SCALE,
+            "FIREBALL_SCALE": constants.FIREBALL_SCALE, "TILE_SIZE": constants.TILE_SIZE,
+            "TILE_TYPES": constants.TILE_TYPES}
+
+
+# Sprite groups: group name -> list of (sprite name, image file, scale)
+# Tiles have no scale, they are scaled to the tile size
+def sprite_groups():
+    groups = {
+        "buttons": [(name, f"assets/images/buttons/button_{name}.png", constants.BUTTON_SCALE)
+                    for name in ["start", "restart", "exit", "resume"]],
+        "items": [(name, f"assets/images/items/{name}.png", constants.ITEM_SCALE)
+                  for name in ["heart_empty", "heart_half", "heart_full", "coin_f0", "coin_f1", "coin_f2", "coin_f3"]],
+        "weapons": [("bow", "assets/images/weapons/bow.png", constants.WEAPON_SCALE),
+                    ("arrow", "assets/images/weapons/arrow.png", constants.WEAPON_SCALE),
+                    ("fireball", "assets/images/weapons/fireball.png", constants.FIREBALL_SCALE)],
+        "tiles": [(str(x), f"assets/images/tiles/{x}.png", None) for x in range(constants.TILE_TYPES)],
+    }
+    groups["items"].append(("potion_red", "assets/images/items/potion_red.png", constants.POTION_SCALE))
+    for mob in MOB_TYPES:
+        groups[mob] = [(f"{animation}/{i}", f"assets/images/characters/{mob}/{animation}/{i}.png", constants.SCALE)
+                       for animation in ANIMATION_TYPES for i in range(4)]
+    return groups
+
+
+# crc32 of the image files of a sprite group
+def source_crc(sprites):
+    crc = 0
+    for sprite, path, scale in sprites:
+        with open(path, "rb") as image_file:
+            crc = zlib.crc32(image_file.read(), crc)
+    return crc
+
+
+def load_sprite(path, scale):
+    # Load image, match the game window, alpha is for transparency
+    image = pygame.image.load(path).convert_alpha()
+    if scale is None:
+        return pygame.transform.scale(image, (constants.TILE_SIZE, constants.TILE_SIZE))
+    return scale_img(image, scale)
+
+
+# Loads sprites and sounds when they are first needed.
+# Sprites come from the asset pack if there is one made with the current scale constants and images,
+# otherwise they are loaded and scaled from the image files. A broken pack is treated like a missing one.
+class AssetManager():
+    def __init__(self, pack_path=PACK_PATH):
+        self.groups = sprite_groups()
+        self.loaded = {}
+        self.pack_data = None
+        self.pack_index = None
+        self.pack_start = 0
+        # Levels are built in a background thread, so groups can be loaded from two threads
+        self.lock = threading.Lock()
+        self.mob_animations = MobAnimations(self)
+        if os.path.exists(pack_path):
+            with open(pack_path, "rb") as pack_file:
+                data = pack_file.read()
+            try:
+                magic, index_length = PACK_HEADER.unpack_from(data)
+                if magic == PACK_MAGIC:
+                    index = json.loads(data[PACK_HEADER.size:PACK_HEADER.size + index_length])
+                    if index["settings"] == pack_settings() and isinstance(index["groups"], dict):
+                        self.pack_data = data
+                        self.pack_index = index
+                        self.pack_start = PACK_HEADER.size + index_length
+            except (struct.error, ValueError, KeyError, TypeError):
+                # Truncated file or broken index
+                pass
+
+    # Return the sprites of a group as a dictionary, load the group if it is not loaded yet
+    def group(self, name):
+        with self.lock:
+            if name not in self.loaded:
+                sprites = self.load_packed_group(name)
+                if sprites is None:
+                    sprites = {sprite: load_sprite(path, scale) for sprite, path, scale in self.groups[name]}
+                self.loaded[name] = sprites
+            return self.loaded[name]
+
+    # Return the sprites of a group from the pack, None if the pack has no readable atlas of the current images
+    def load_packed_group(self, name):
+        if not self.pack_index:
+            return None
+        group = self.pack_index["groups"].get(name)
+        try:
+            # An image was changed after the pack was built
+            if not group or group["source_crc"] != source_crc(self.groups[name]):
+                return None
+            start = self.pack_start + group["offset"]
+            pixels = zlib.decompress(self.pack_data[start:start + group["length"]])
+            atlas = pygame.image.frombuffer(pixels, group["size"], "RGBA").convert_alpha()
+            return {sprite: atlas.subsurface(rect) for sprite, rect in group["sprites"].items()}
+        except (zlib.error, ValueError, KeyError, TypeError):
+            return None
+
+    def image(self, group, name):
+        return self.group(group)[name]
+
+    def tile_list(self):
+        tiles = self.group("tiles")
+        return [tiles[str(x)] for x in range(constants.TILE_TYPES)]
+
+    def item_images(self):
+        items = self.group("items")
+        return [[items[f"coin_f{x}"] for x in range(4)], items["potion_red"]]
+
+    def animations(self, mob):
+        frames = self.group(mob)
+        return [[frames[f"{animation}/{i}"] for i in range(4)] for animation in ANIMATION_TYPES]
+
+    # Load sounds: arrow shot, arrow hit, coin, heal
+    def load_sounds(self):
+        sounds = []
+        for path in ["assets/audio/arrow_shot.mp3", "assets/audio/arrow_hit.wav",
+                     "assets/audio/coin.wav", "assets/audio/heal.wav"]:
+            sound = pygame.mixer.Sound(path)
+            sound.set_volume(0.5)
+            sounds.append(sound)
+        return sounds
+
+    def play_music(self):
+        pygame.mixer.music.load("assets/audio/music.wav")
+        pygame.mixer.music.set_volume(0.3)  # Set volume
+        pygame.mixer.music.play(-1, 0.0, 5000)  # -1: run as loop, 0.0: start point of audio, 5000 ms fade in effect
+
+
+# Character animations of all mob types, indexed by character type like a list.
+# The animations of a mob type are only loaded when a character of that type is created
+class MobAnimations():
+    def __init__(self, assets):
+        self.assets = assets
+
+    def __getitem__(self, char_type):
+        return self.assets.animations(MOB_TYPES[char_type])
+
+    def __len__(self):
+        return len(MOB_TYPES)
+
+
+# Put the sprites of a group into one atlas, row by row
+def build_atlas(sprites):
+    rects = {}
+    x = 0
+    y = 0
+    row_height = 0
+    for name, image in sprites.items():
+        width, height = image.get_size()
+        if x + width > ATLAS_WIDTH:
+            x = 0
+            y += row_height
+            row_height = 0
+        rects[name] = [x, y, width, height]
+        x += width
+        row_height = max(row_height, height)
+    atlas_width = max(rect[0] + rect[2] for rect in rects.values())
+    atlas = pygame.Surface((atlas_width, y + row_height), pygame.SRCALPHA)
+    for name, image in sprites.items():
+        # Copy the pixels as they are instead of blending them onto the empty atlas
+        atlas.blit(image, rects[name][:2], special_flags=pygame.BLEND_RGBA_MAX)
+    return atlas, rects
+
+
+def build_pack(pack_path=PACK_PATH):
+    index = {"settings": pack_settings(), "groups": {}}
+    blobs = []
+    offset = 0
+    for name, sprites in sprite_groups().items():
+        atlas, rects = build_atlas({sprite: load_sprite(path, scale) for sprite, path, scale in sprites})
+        blob = zlib.compress(pygame.image.tobytes(atlas, "RGBA"), 9)
+        index["groups"][name] = {"offset": offset, "length": len(blob), "size": list(atlas.get_size()),
+                                 "sprites": rects, "source_crc": source_crc(sprites)}
+        blobs.append(blob)
+        offset += len(blob)
+
+    index_data = json.dumps(index).encode()
+    os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+    with open(pack_path, "wb") as pack_file:
+        pack_file.write(PACK_HEADER.pack(PACK_MAGIC, len(index_data)))
+        pack_file.write(index_data)
+        for blob in blobs:
+            pack_file.write(blob)
+    print(f"Wrote {pack_path} ({len(index['groups'])} groups)")
+
+
+# Bake the sprites into the asset pack: python assets.py
+if __name__ == "__main__":
+    # Images are converted to the display format, which needs a display
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    build_pack()
+    pygame.quit()
@@ -0,0 +1,107 @@
+import constants
+import sim_clock
+
+# NumPy is optional, without it every enemy runs Character.ai on its own
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STUN_COOLDOWN = 150
+FIREBALL_COOLDOWN = 700
+FIREBALL_RANGE = 500
+
+
+# Runs the AI of many enemies at once (same rules as Character.ai).
+# Stun state and cooldown timestamps are kept in NumPy arrays (one entry per enemy).
+# Positions stay in the enemy rects (Character.move handles the wall collisions), they are read every update.
+# Distances, chase directions, attacks and boss fireballs are computed for all enemies in one step,
+# then the changes are written back to the Character objects that are used for movement and drawing.
+# The arrays are only up to date if the AI of the enemies always runs through the batch.
+class BatchAI():
+    def __init__(self, enemies):
+        self.index = {enemy: i for i, enemy in enumerate(enemies)}
+        self.boss = np.array([enemy.boss for enemy in enemies], dtype=bool)
+        self.stunned = np.array([enemy.stunned for enemy in enemies], dtype=bool)
+        self.last_hit = np.array([enemy.last_hit for enemy in enemies], dtype=float)
+        self.last_attack = np.array([enemy.last_attack for enemy in enemies], dtype=float)
+
+    # Update the AI of the given (alive) enemies, each enemy moves the given number of steps
+    def update(self, enemies, steps, player, line_of_sight, flow_field, wall_grid, projectiles):
+        if not enemies:
+            return
+        now = sim_clock.get_ticks()
+        count = len(enemies)
+        idx = np.fromiter((self.index[enemy] for enemy in enemies), dtype=np.intp, count=count)
+
+        # Read the state that is changed outside of the AI (movement, arrow hits)
+        x = np.fromiter((enemy.rect.centerx for enemy in enemies), dtype=float, count=count)
+        y = np.fromiter((enemy.rect.centery for enemy in enemies), dtype=float, count=count)
+        hit = np.fromiter((enemy.hit for enemy in enemies), dtype=bool, count=count)
+
+        # Check distance to player with pythagoras
+        player_x, player_y = player.rect.center
+        dist = np.hypot(x - player_x, y - player_y)
+
+        # Check line of sight (cached per enemy tile and player tile)
+        half_tile = constants.TILE_SIZE // 2
+        columns = ((x + half_tile) // constants.TILE_SIZE).astype(int)
+        rows = ((y + half_tile) // constants.TILE_SIZE).astype(int)
+        player_cell = wall_grid.cell_at(player_x, player_y)
+        cells = list(zip(columns.tolist(), rows.tolist()))
+        clear_sight = np.fromiter((line_of_sight.is_clear(cell, player_cell) for cell in cells), dtype=bool, count=count)
+
+        # Chase the player if there is a clear line of sight and the enemy is not too close
+        chase = clear_sight & (dist > constants.ENEMY_RANGE_TO_PLAYER)
+        ai_dx = np.where(chase, np.sign(player_x - x), 0) * constants.ENEMY_SPEED
+        ai_dy = np.where(chase, np.sign(player_y - y), 0) * constants.ENEMY_SPEED
+        # Enemies that can't see the player walk towards the center of the next tile on the path to the player
+        for i in np.flatnonzero(~clear_sight).tolist():
+            next_cell = flow_field.next_cell(cells[i])
+            if next_cell:
+                ai_dx[i] = np.sign(next_cell[0] * constants.TILE_SIZE - x[i]) * constants.ENEMY_SPEED
+                ai_dy[i] = np.sign(next_cell[1] * constants.TILE_SIZE - y[i]) * constants.ENEMY_SPEED
+
+        # Enemies that are not stunned move, attack and shoot fireballs
+        acting = ~self.stunned[idx]
+        steps = np.fromiter(steps, dtype=float, count=count)
+        ai_dx *= steps
+        ai_dy *= steps
+        for i in np.flatnonzero(acting).tolist():
+            enemies[i].move(int(ai_dx[i]), int(ai_dy[i]), wall_grid)
+
+        # The first enemy in range attacks, the player then can't be hit until the hit cooldown ends
+        attackers = np.flatnonzero(acting & (dist < constants.ATTACK_RANGE))
+        if attackers.size and not player.hit:
+            player.health -= 10
+            player.hit = True
+            player.last_hit = now
+
+        # Boss enemies shoot fireballs
+        shooting = acting & self.boss[idx] & (dist < FIREBALL_RANGE) & \
+            (now - self.last_attack[idx] >= FIREBALL_COOLDOWN)
+        for i in np.flatnonzero(shooting).tolist():
+            enemy = enemies[i]
+            projectiles.shoot_fireball(enemy.rect.centerx, enemy.rect.centery, player_x, player_y)
+            enemy.last_attack = now
+        self.last_attack[idx[shooting]] = now
+
+        # Enemies that got hit are stunned, reset stun after stun cooldown
+        self.last_hit[idx[hit]] = now
+        was_stunned = self.stunned[idx]
+        stunned = (was_stunned | hit) & ~(now - self.last_hit[idx] > STUN_COOLDOWN)
+        self.stunned[idx] = stunned
+
+        # Write the changes back to the characters
+        for i in np.flatnonzero(hit).tolist():
+            enemy = enemies[i]
+            enemy.hit = False
+            enemy.last_hit = now
+            enemy.running = False
+            enemy.update_action(0)
+        for i in np.flatnonzero(stunned != was_stunned).tolist():
+            enemies[i].stunned = bool(stunned[i])
+
+
+def available():
+    return np is not None
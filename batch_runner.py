@@ -0,0 +1,208 @@
+import argparse
+import json
+import math
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import constants
+import headless
+import benchmark
+from game import Controls
+from level_loader import level_exists
+
+BOT_NAMES = ["idle", "scripted", "random", "hunter", "exit"]
+# Hunters shoot at enemies closer than this (in pixels)
+HUNT_RANGE = 400
+# Steps of the player in pixels, moving diagonally the step on each axis is rounded
+STRAIGHT_STEP = constants.SPEED
+DIAGONAL_STEP = round(constants.SPEED * math.sqrt(2) / 2)
+
+
+# The player is one pixel smaller than a tile, so it only fits between two walls if its center is
+# 0 or 1 pixels before the center of the tile. Return the first step (STRAIGHT_STEP or DIAGONAL_STEP towards
+# the center) for every distance up to limit pixels, found with a breadth first search backwards from the center
+def alignment_steps(limit):
+    steps = {0: 0, 1: 0}
+    queue = deque(steps)
+    while queue:
+        distance = queue.popleft()
+        for step in (DIAGONAL_STEP, STRAIGHT_STEP, -DIAGONAL_STEP, -STRAIGHT_STEP):
+            previous = distance + step
+            if abs(previous) <= limit and previous not in steps:
+                steps[previous] = step
+                queue.append(previous)
+    return steps
+
+
+ALIGNMENT_STEPS = alignment_steps(constants.TILE_SIZE)
+
+
+# Bots decide the input of the player every frame. Random decisions come from the seed of the run
+class IdleBot():
+    def __init__(self, seed):
+        pass
+
+    def controls(self, game, frame):
+        return Controls()
+
+
+# The input sequence of the benchmark
+class ScriptedBot(IdleBot):
+    def controls(self, game, frame):
+        return benchmark.scripted_controls(frame)
+
+
+# Walks in a random direction for a while and shoots at random places
+class RandomBot():
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.move = (False, False, False, False)
+
+    def controls(self, game, frame):
+        if frame % 30 == 0:
+            self.move = tuple(self.rng.random() < 0.3 for i in range(4))
+        controls = Controls()
+        controls.moving_left, controls.moving_right, controls.moving_up, controls.moving_down = self.move
+        controls.mouse_pos = (self.rng.randrange(constants.SCREEN_WIDTH), self.rng.randrange(constants.SCREEN_HEIGHT))
+        controls.fire = frame % 10 < 5
+        return controls
+
+
+# Shoots at the closest enemy in range and walks towards it, walks around randomly when no enemy is near
+class HunterBot(RandomBot):
+    def controls(self, game, frame):
+        controls = super().controls(game, frame)
+        player = game.player
+        enemies = [character for character in game.character_hash.query_radius(*player.rect.center, HUNT_RANGE)
+                   if character is not player and character.alive]
+        if enemies:
+            target = min(enemies, key=lambda enemy: math.dist(enemy.rect.center, player.rect.center))
+            controls.mouse_pos = game.camera.to_screen(*target.rect.center)
+            # Keep some distance, enemies hit the player when they are close
+            close = math.dist(target.rect.center, player.rect.center) < constants.ATTACK_RANGE * 3
+            controls.moving_left = target.rect.centerx < player.rect.centerx and not close
+            controls.moving_right = target.rect.centerx > player.rect.centerx and not close
+            controls.moving_up = target.rect.centery < player.rect.centery and not close
+            controls.moving_down = target.rect.centery > player.rect.centery and not close
+        return controls
+
+
+# Walks to the exit over the distances to the exit computed when the level was compiled,
+# shoots at the closest enemy in range on the way
+class ExitBot(HunterBot):
+    def controls(self, game, frame):
+        controls = super().controls(game, frame)
+        player = game.player
+        cell = game.world.wall_grid.cell_at(*player.rect.center)
+        # None on the exit tile (or off the map), then walk to the center of the tile
+        next_cell = game.world.navigation.next_cell_to_exit(cell) or cell
+        dx = next_cell[0] * constants.TILE_SIZE - player.rect.centerx
+        dy = next_cell[1] * constants.TILE_SIZE - player.rect.centery
+        # Walk along the path and keep the center on the other axis at the center of the tile
+        walk_x = next_cell[0] != cell[0]
+        walk, side = (dx, dy) if walk_x else (dy, dx)
+        side_step = ALIGNMENT_STEPS.get(side, STRAIGHT_STEP if side > 0 else -STRAIGHT_STEP)
+        # A straight step on the other axis means not walking for one frame
+        walk_step = walk if walk not in (0, 1) and abs(side_step) != STRAIGHT_STEP else 0
+        step_x, step_y = (walk_step, side_step) if walk_x else (side_step, walk_step)
+        controls.moving_left = step_x < 0
+        controls.moving_right = step_x > 0
+        controls.moving_up = step_y < 0
+        controls.moving_down = step_y > 0
+        return controls
+
+
+BOTS = {"idle": IdleBot, "scripted": ScriptedBot, "random": RandomBot, "hunter": HunterBot, "exit": ExitBot}
+
+# Images are loaded once per worker process and shared by all runs of the process
+worker_assets = None
+
+
+# Play one game until the player dies, the level is completed or the frame limit is reached
+def run_game(level, seed, bot_name, frames):
+    global worker_assets
+    game, surface = headless.create_game(level, seed, worker_assets)
+    worker_assets = game.level_preloader.assets
+    bot = BOTS[bot_name](seed)
+
+    damage_taken = 0
+    health = game.player.health
+    frame = 0
+    while frame < frames and game.player.alive and not game.level_complete:
+        game.update(bot.controls(game, frame))
+        headless.sim_clock.advance()
+        frame += 1
+        # Health lost this frame (potions heal, so only count decreases)
+        if game.player.health < health:
+            damage_taken += health - game.player.health
+        health = game.player.health
+    result = {"level": level, "seed": seed, "bot": bot_name, "survival_time": frame / constants.FPS,
+              "died": not game.player.alive, "completed": game.level_complete,
+              "coins": game.player.score, "damage_taken": damage_taken}
+    game.shutdown()
+    return result
+
+
+# Mean values of the runs of every level and bot
+def aggregate(results):
+    groups = {}
+    for result in results:
+        groups.setdefault((result["level"], result["bot"]), []).append(result)
+    summary = []
+    for (level, bot_name), runs in sorted(groups.items()):
+        count = len(runs)
+        summary.append({
+            "level": level, "bot": bot_name, "runs": count,
+            "survival_time": sum(run["survival_time"] for run in runs) / count,
+            "deaths": sum(run["died"] for run in runs) / count,
+            "completed": sum(run["completed"] for run in runs) / count,
+            "coins": sum(run["coins"] for run in runs) / count,
+            "damage_taken": sum(run["damage_taken"] for run in runs) / count,
+        })
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many headless games in parallel and collect statistics")
+    parser.add_argument("--levels", type=int, nargs="*", help="levels to run (all levels if not given)")
+    parser.add_argument("--seeds", type=int, default=10, help="runs with different random seeds per level and bot")
+    parser.add_argument("--bots", nargs="*", choices=BOT_NAMES, default=BOT_NAMES)
+    parser.add_argument("--frames", type=int, default=3600, help="frame limit of a run")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of processes")
+    parser.add_argument("--output", help="write the results of all runs and the summary to a json file")
+    args = parser.parse_args()
+
+    levels = args.levels
+    if not levels:
+        levels = []
+        while level_exists(len(levels) + 1):
+            levels.append(len(levels) + 1)
+
+    runs = [(level, seed, bot_name, args.frames) for level in levels for seed in range(args.seeds)
+            for bot_name in args.bots]
+    start = time.perf_counter()
+    results = []
+    # Every run is a separate task, results are printed as soon as a run is done
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(run_game, *run) for run in runs]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            print(f"[{len(results)}/{len(runs)}] level {result['level']} seed {result['seed']} {result['bot']}: "
+                  f"survived {result['survival_time']:.1f} s, coins {result['coins']}, "
+                  f"damage taken {result['damage_taken']}" + (", completed" if result["completed"] else ""),
+                  flush=True)
+    duration = time.perf_counter() - start
+
+    summary = aggregate(results)
+    print(f"\n{len(runs)} runs in {duration:.1f} s with {args.workers} processes")
+    print(f"{'level':<6}{'bot':<10}{'runs':>5}{'survival s':>12}{'deaths':>8}{'completed':>11}{'coins':>7}{'damage':>8}")
+    for row in summary:
+        print(f"{row['level']:<6}{row['bot']:<10}{row['runs']:>5}{row['survival_time']:>12.1f}{row['deaths']:>8.0%}"
+              f"{row['completed']:>11.0%}{row['coins']:>7.1f}{row['damage_taken']:>8.1f}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"runs": results, "summary": summary}, output_file, indent=2)
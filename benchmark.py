@@ -0,0 +1,193 @@
+import argparse
+import json
+import math
+import random
+import statistics
+import sys
+import pygame
+import constants
+import headless
+from game import Controls
+from character import Character
+from level_loader import level_exists
+import batch_ai
+
+# Movement keys (left, right, up, down) of the scripted input, each is held for MOVE_FRAMES frames
+MOVES = [(False, True, False, False), (False, True, False, True), (False, False, False, True),
+         (True, False, False, True), (True, False, False, False), (True, False, True, False),
+         (False, False, True, False), (False, True, True, False)]
+MOVE_FRAMES = 60
+PHASES = ["player", "world", "enemies", "projectiles", "items", "draw"]
+
+
+# The same input sequence for every run: walk in all directions, aim in circles and fire the bow
+def scripted_controls(frame):
+    controls = Controls()
+    move = MOVES[(frame // MOVE_FRAMES) % len(MOVES)]
+    controls.moving_left, controls.moving_right, controls.moving_up, controls.moving_down = move
+    angle = math.radians(frame * 3)
+    controls.mouse_pos = (constants.SCREEN_WIDTH // 2 + int(math.cos(angle) * 300),
+                          constants.SCREEN_HEIGHT // 2 + int(math.sin(angle) * 300))
+    controls.fire = frame % 10 < 5
+    return controls
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+
+# Run the scripted input on a level, return frame time statistics and the mean time of each phase (ms).
+# The first warmup frames (caches filling up, chunks being drawn the first time) are played but not measured
+def run_level(level, frames, warmup):
+    game, surface = headless.create_game(level, seed=0)
+    # Let the preloading of the next level finish so it does not slow down the first frames
+    if game.level_preloader.future:
+        game.level_preloader.future.result()
+    game.timer.enabled = True
+
+    frame_times = []
+    phase_totals = dict.fromkeys(PHASES, 0)
+    for frame in range(warmup + frames):
+        game.timer.start_frame()
+        game.update(scripted_controls(frame))
+        game.draw(surface)
+        headless.sim_clock.advance()
+        if frame >= warmup:
+            frame_times.append(game.timer.frame_time() * 1000)
+            for phase, duration in game.timer.phase_times.items():
+                phase_totals[phase] += duration * 1000
+        # Keep playing the same level
+        if game.level_complete or not game.player.alive:
+            game.restart_level()
+    game.shutdown()
+
+    return {
+        "frame_time": {"mean": sum(frame_times) / frames, "p95": percentile(frame_times, 95),
+                       "p99": percentile(frame_times, 99)},
+        "phases": {phase: total / frames for phase, total in phase_totals.items()},
+    }
+
+
+# Run a level several times. Every value is the median of the runs, and its noise is how much it varied
+# between the runs (max - min), differences smaller than the noise are not counted as regressions
+def benchmark_level(level, frames, warmup=200, repeats=5):
+    runs = [run_level(level, frames, warmup) for repeat in range(repeats)]
+    result = {"frame_time": {}, "phases": {}, "noise": {"frame_time": {}, "phases": {}}}
+    for group in ("frame_time", "phases"):
+        for name in runs[0][group]:
+            values = [run[group][name] for run in runs]
+            result[group][name] = statistics.median(values)
+            result["noise"][group][name] = max(values) - min(values)
+    return result
+
+
+# Spread count more enemies over the floor tiles of the level, the same places for the same seed
+def add_enemies(game, count, seed=0):
+    world = game.world
+    rng = random.Random(seed)
+    floor = [(column, row) for row, tiles in enumerate(world.tile_map) for column, tile in enumerate(tiles)
+             if tile and (column, row) not in world.wall_grid.cells]
+    animations = game.level_preloader.assets.mob_animations
+    for column, row in rng.sample(floor, min(count, len(floor))):
+        enemy = Character(column * constants.TILE_SIZE, row * constants.TILE_SIZE, 100, animations,
+                          1 + (column + row) % 5, False, 1)
+        world.character_list.append(enemy)
+    game.set_world(world)
+
+
+# Mean time of the enemy phase per frame (ms) on level 1 with count more enemies,
+# with the batch AI or with the AI of each enemy on its own. All enemies are always awake
+def benchmark_ai(count, batch, frames):
+    constants.BATCH_AI = batch
+    constants.BATCH_AI_MIN_ENEMIES = 0
+    constants.AI_WAKE_REGIONS = max(constants.ROWS, constants.COLUMNS) // constants.AI_REGION_TILES + 1
+    game, surface = headless.create_game(1, seed=0)
+    if game.level_preloader.future:
+        game.level_preloader.future.result()
+    add_enemies(game, count)
+    game.timer.enabled = True
+    total = 0
+    for frame in range(frames):
+        game.timer.start_frame()
+        game.update(scripted_controls(frame))
+        headless.sim_clock.advance()
+        total += game.timer.phase_times.get("enemies", 0) * 1000
+        if game.level_complete or not game.player.alive:
+            game.restart_level()
+    game.shutdown()
+    return total / frames
+
+
+# Return a list of (name, baseline ms, current ms) for every value that got slower than the threshold allows.
+# A difference is only a regression if it is bigger than the noise of the value in both result files
+def find_regressions(baseline, results, threshold):
+    regressions = []
+    for level, result in results["levels"].items():
+        if level not in baseline["levels"]:
+            continue
+        base = baseline["levels"][level]
+        for group, prefix in (("frame_time", "frame "), ("phases", "")):
+            base_noise = base.get("noise", {}).get(group, {})
+            noise = result.get("noise", {}).get(group, {})
+            for name, new in result[group].items():
+                old = base[group].get(name, 0)
+                min_difference = max(base_noise.get(name, 0), noise.get(name, 0))
+                if new > old * (1 + threshold) and new - old > min_difference:
+                    regressions.append((f"level {level} {prefix}{name}", old, new))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure frame times of the shipped levels with a scripted input")
+    parser.add_argument("--frames", type=int, default=1000, help="measured frames per run")
+    parser.add_argument("--warmup", type=int, default=200, help="frames played before measuring")
+    parser.add_argument("--repeats", type=int, default=5, help="runs per level, the median of the runs is reported")
+    parser.add_argument("--levels", type=int, nargs="*", help="levels to run (all levels if not given)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare the results with a stored results file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed slowdown when comparing (0.1 = 10%%)")
+    parser.add_argument("--ai", type=int, nargs="+", metavar="ENEMIES",
+                        help="instead of the levels, compare the batch AI with the AI of each enemy "
+                             "with this many more enemies on level 1 (to choose BATCH_AI and BATCH_AI_MIN_ENEMIES)")
+    args = parser.parse_args()
+
+    if args.ai:
+        if not batch_ai.available():
+            sys.exit("The batch AI needs NumPy")
+        for count in args.ai:
+            batch_time = benchmark_ai(count, True, args.frames)
+            single_time = benchmark_ai(count, False, args.frames)
+            print(f"{count} enemies: batch AI {batch_time:.3f} ms, AI of each enemy {single_time:.3f} ms per frame")
+        pygame.quit()
+        sys.exit()
+
+    levels = args.levels
+    if not levels:
+        levels = []
+        while level_exists(len(levels) + 1):
+            levels.append(len(levels) + 1)
+
+    results = {"frames": args.frames, "warmup": args.warmup, "repeats": args.repeats, "levels": {}}
+    for level in levels:
+        result = benchmark_level(level, args.frames, args.warmup, args.repeats)
+        results["levels"][str(level)] = result
+        frame_time = result["frame_time"]
+        phases = " ".join(f"{phase} {value:.3f}" for phase, value in result["phases"].items())
+        print(f"Level {level}: mean {frame_time['mean']:.3f} ms, p95 {frame_time['p95']:.3f} ms, "
+              f"p99 {frame_time['p99']:.3f} ms | {phases}")
+    pygame.quit()
+
+    with open(args.output, "w") as results_file:
+        json.dump(results, results_file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = find_regressions(baseline, results, args.threshold)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.3f} ms -> {new:.3f} ms")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
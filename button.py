@@ -7,16 +7,16 @@ class Button():
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
 
+    # Drawing and clicking are separate, so a static screen can draw its buttons once and keep checking clicks
     def draw(self, surface):
-        action = False
+        surface.blit(self.image, self.rect)
+        return self.rect
 
+    # click_pos is the position of a mouse click event, a fast click can be over before the mouse state is checked
+    def clicked(self, click_pos=None):
+        if click_pos and self.rect.collidepoint(click_pos):
+            return True
         # Get mouse position
         pos = pygame.mouse.get_pos()
         # Check mouseover and clicked conditions
-        if self.rect.collidepoint(pos):
-            if pygame.mouse.get_pressed()[0]:
-                action = True
-
-        surface.blit(self.image, self.rect)
-
-        return action
+        return self.rect.collidepoint(pos) and pygame.mouse.get_pressed()[0]
@@ -0,0 +1,48 @@
+import pygame
+import constants
+
+
+# The camera should follow the player
+# But the camera is not always centered to the player
+# The maximum space between the player and the edge of screen is constants.SCROLL_THRESH
+# Everything in the game is kept in world coordinates, scrolling only changes the camera offset
+# and things are translated to the screen when they are drawn
+class Camera():
+    def __init__(self):
+        self.offset_x = 0
+        self.offset_y = 0
+
+    # Move the camera depending on the position of the followed rect (the player)
+    def update(self, target_rect):
+        # Move camera left-right
+        if target_rect.right - self.offset_x > constants.SCREEN_WIDTH - constants.SCROLL_THRESH:
+            self.offset_x = target_rect.right - (constants.SCREEN_WIDTH - constants.SCROLL_THRESH)
+        if target_rect.left - self.offset_x < constants.SCROLL_THRESH:
+            self.offset_x = target_rect.left - constants.SCROLL_THRESH
+
+        # Move camera up-down
+        if target_rect.bottom - self.offset_y > constants.SCREEN_HEIGHT - constants.SCROLL_THRESH:
+            self.offset_y = target_rect.bottom - (constants.SCREEN_HEIGHT - constants.SCROLL_THRESH)
+        if target_rect.top - self.offset_y < constants.SCROLL_THRESH:
+            self.offset_y = target_rect.top - constants.SCROLL_THRESH
+
+    # The part of the world that is visible on the screen
+    @property
+    def rect(self):
+        return pygame.Rect(self.offset_x, self.offset_y, constants.SCREEN_WIDTH, constants.SCREEN_HEIGHT)
+
+    # Return only the things (with a rect in world coordinates) that are on the screen
+    # Images can be bigger than their rect (rotated images, the offset of the player image), so use a margin
+    def visible(self, things, margin=constants.TILE_SIZE):
+        view = self.rect.inflate(margin * 2, margin * 2)
+        return [thing for thing in things if view.colliderect(thing.rect)]
+
+    # Translate a rect from world to screen coordinates
+    def apply(self, rect):
+        return rect.move(-self.offset_x, -self.offset_y)
+
+    def to_screen(self, x, y):
+        return x - self.offset_x, y - self.offset_y
+
+    def to_world(self, x, y):
+        return x + self.offset_x, y + self.offset_y
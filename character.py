@@ -1,7 +1,8 @@
 import pygame
 import constants
 import math
-import weapon
+import transform_cache
+import sim_clock
 
 
 class Character():
@@ -16,11 +17,11 @@ class Character():
         self.running = False
         self.health = health
         self.alive = True
-        self.update_time = pygame.time.get_ticks()
+        self.update_time = sim_clock.get_ticks()
         # If player gets hit, cooldown to avoid very fast hits
         self.hit = False
-        self.last_hit = pygame.time.get_ticks()
-        self.last_attack = pygame.time.get_ticks()
+        self.last_hit = sim_clock.get_ticks()
+        self.last_attack = sim_clock.get_ticks()
         self.stunned = False
 
         self.image = self.animation_list[self.action][self.frame_index]  # 0 is the idle animation list
@@ -30,8 +31,7 @@ class Character():
         self.rect = pygame.Rect(0, 0, constants.TILE_SIZE * size - 1, constants.TILE_SIZE * size - 1)
         self.rect.center = (x, y)
 
-    def move(self, dx, dy, obstacle_tiles, exit_tile=None):
-        screen_scroll = [0, 0]
+    def move(self, dx, dy, wall_grid, exit_tile=None):
         level_complete = False
         self.running = False
         # If player is moving, set running to true to animate running images
@@ -51,31 +51,36 @@ class Character():
             dy = dy * (math.sqrt(2) / 2)
 
         # Check for collision with map in x direction
-        self.rect.x += dx
-        for obstacle in obstacle_tiles:
-            # 1. index is the rectangle of obstacle
-            # Check the rect collisions
-            if obstacle[1].colliderect(self.rect):
-                # Check which side the collision is from
-                if dx > 0:
-                    self.rect.right = obstacle[1].left
-                if dx < 0:
-                    self.rect.left = obstacle[1].right
+        # Walls only push the character back if it moves in that direction
+        if dx != 0:
+            old_rect = self.rect.copy()
+            self.rect.x += dx
+            # Only test the walls near the character, the rect can only be pushed back towards its old position
+            for obstacle in wall_grid.query(self.rect.union(old_rect)):
+                # 1. index is the rectangle of obstacle
+                # Check the rect collisions
+                if obstacle[1].colliderect(self.rect):
+                    # Check which side the collision is from
+                    if dx > 0:
+                        self.rect.right = obstacle[1].left
+                    if dx < 0:
+                        self.rect.left = obstacle[1].right
         # Check for collision with map in y direction
-        self.rect.y += dy
-        for obstacle in obstacle_tiles:
-            # 1. index is the rectangle of obstacle
-            # Check the rect collisions
-            if obstacle[1].colliderect(self.rect):
-                # Check which side the collision is from
-                if dy> 0:
-                    self.rect.bottom = obstacle[1].top
-                if dy < 0:
-                    self.rect.top = obstacle[1].bottom
-
-        # Move screen depending on player position
+        if dy != 0:
+            old_rect = self.rect.copy()
+            self.rect.y += dy
+            for obstacle in wall_grid.query(self.rect.union(old_rect)):
+                # 1. index is the rectangle of obstacle
+                # Check the rect collisions
+                if obstacle[1].colliderect(self.rect):
+                    # Check which side the collision is from
+                    if dy> 0:
+                        self.rect.bottom = obstacle[1].top
+                    if dy < 0:
+                        self.rect.top = obstacle[1].bottom
+
+        # Check collision with exit ladder
         if self.char_type == 0:
-            # Check collision with exit ladder
             if exit_tile[1].colliderect(self.rect):
                 # Check if player is close to the center of exit ladder
                 exit_dist = math.sqrt(((self.rect.centerx - exit_tile[1].centerx) ** 2) + ((self.rect.centery - exit_tile[1].centery) ** 2))
@@ -83,52 +88,23 @@ class Character():
                     level_complete = True
                     print("Exit")
 
-            # Move camera left-right
-            if self.rect.right > (constants.SCREEN_WIDTH - constants.SCROLL_THRESH):
-                screen_scroll[0] = (constants.SCREEN_WIDTH - constants.SCROLL_THRESH) - self.rect.right
-                # Player freezes at position
-                self.rect.right = constants.SCREEN_WIDTH - constants.SCROLL_THRESH
-            if self.rect.left < constants.SCROLL_THRESH:
-                screen_scroll[0] = constants.SCROLL_THRESH - self.rect.left
-                self.rect.left = constants.SCROLL_THRESH
-
-            # Move camera up-down
-            if self.rect.bottom > (constants.SCREEN_HEIGHT - constants.SCROLL_THRESH):
-                screen_scroll[1] = (constants.SCREEN_HEIGHT - constants.SCROLL_THRESH) - self.rect.bottom
-                # Player freezes at position
-                self.rect.bottom = constants.SCREEN_HEIGHT - constants.SCROLL_THRESH
-            if self.rect.top < constants.SCROLL_THRESH:
-                screen_scroll[1] = constants.SCROLL_THRESH - self.rect.top
-                self.rect.top = constants.SCROLL_THRESH
-
-        return screen_scroll, level_complete
-
-    def ai(self, player, obstacle_tiles, screen_scroll, fireball_image):
-        clipped_line = ()
+        return level_complete
+
+    # Enemies whose AI only runs every few frames move the steps of the skipped frames at once
+    def ai(self, player, line_of_sight, flow_field, wall_grid, projectiles, steps=1):
         stun_cooldown = 150
         ai_dx = 0
         ai_dy = 0
-        fireball = None
-
-        # Reposition mobs based on screen scroll
-        self.rect.x += screen_scroll[0]
-        self.rect.y += screen_scroll[1]
-
-        # Create line of sight from enemy to player
-        line_of_sight = ((self.rect.centerx, self.rect.centery), (player.rect.centerx, player.rect.centery))
-        # pygame.draw.line(surface, constants.RED, line_of_sight[0], line_of_sight[1])
-        # Check if line of sight passes through an obstacle tile
-        for obstacle in obstacle_tiles:
-            # First index is its rectangle
-            if obstacle[1].clipline(line_of_sight):
-                # Returns the actual line and not true or false
-                # If there is a direct line of sight, it returns ()
-                clipped_line = obstacle[1].clipline(line_of_sight)
+
+        # Check if the line of sight from enemy to player passes through a wall tile
+        enemy_cell = wall_grid.cell_at(self.rect.centerx, self.rect.centery)
+        player_cell = wall_grid.cell_at(player.rect.centerx, player.rect.centery)
+        clear_sight = line_of_sight.is_clear(enemy_cell, player_cell)
 
         # Check distance to player with pythagoras
         dist = math.sqrt(((self.rect.centerx - player.rect.centerx) ** 2) + ((self.rect.centery - player.rect.centery) ** 2))
         # If enemy has clear line of sight and is within the allowed range to the player
-        if not clipped_line and dist > constants.ENEMY_RANGE_TO_PLAYER:
+        if clear_sight and dist > constants.ENEMY_RANGE_TO_PLAYER:
             if self.rect.centerx > player.rect.centerx:
                 ai_dx = -constants.ENEMY_SPEED
             if self.rect.centerx < player.rect.centerx:
@@ -137,39 +113,51 @@ class Character():
                 ai_dy = -constants.ENEMY_SPEED
             if self.rect.centery < player.rect.centery:
                 ai_dy = constants.ENEMY_SPEED
+        # Without line of sight, walk towards the center of the next tile on the path to the player
+        elif not clear_sight:
+            next_cell = flow_field.next_cell(enemy_cell)
+            if next_cell:
+                target_x = next_cell[0] * constants.TILE_SIZE
+                target_y = next_cell[1] * constants.TILE_SIZE
+                if self.rect.centerx > target_x:
+                    ai_dx = -constants.ENEMY_SPEED
+                if self.rect.centerx < target_x:
+                    ai_dx = constants.ENEMY_SPEED
+                if self.rect.centery > target_y:
+                    ai_dy = -constants.ENEMY_SPEED
+                if self.rect.centery < target_y:
+                    ai_dy = constants.ENEMY_SPEED
 
         if self.alive:
             # Move towards player if not stunned
             if not self.stunned:
-                self.move(ai_dx, ai_dy, obstacle_tiles)
+                self.move(ai_dx * steps, ai_dy * steps, wall_grid)
                 # Enemy attacks player if in range
                 if dist < constants.ATTACK_RANGE and not player.hit:
                     player.health -= 10
                     player.hit = True
-                    player.last_hit = pygame.time.get_ticks()
+                    player.last_hit = sim_clock.get_ticks()
                 # Boss enemies shoot fireballs
                 fireball_cooldown = 700
                 if self.boss:
                     if dist < 500:
-                        if pygame.time.get_ticks() - self.last_attack >= fireball_cooldown:
-                            fireball = weapon.Fireball(fireball_image, self.rect.centerx, self.rect.centery,
+                        if sim_clock.get_ticks() - self.last_attack >= fireball_cooldown:
+                            projectiles.shoot_fireball(self.rect.centerx, self.rect.centery,
                                                        player.rect.centerx, player.rect.centery)
-                            self.last_attack = pygame.time.get_ticks()
+                            self.last_attack = sim_clock.get_ticks()
 
             # Check if hit
             if self.hit:
                 self.hit = False
-                self.last_hit = pygame.time.get_ticks()
+                self.last_hit = sim_clock.get_ticks()
                 self.stunned = True
                 self.running = False
                 self.update_action(0)
 
             # Reset stun after stun cooldown
-            if pygame.time.get_ticks() - self.last_hit > stun_cooldown:
+            if sim_clock.get_ticks() - self.last_hit > stun_cooldown:
                 self.stunned = False
 
-        return fireball
-
     # Update the animation of the character (Switch between images)
     def update(self):
         # Check if character died
@@ -180,7 +168,7 @@ class Character():
         # Timer to reset player taking a hit
         hit_cooldown = 1000
         if self.char_type == 0:
-            if self.hit and (pygame.time.get_ticks() - self.last_hit > hit_cooldown):
+            if self.hit and (sim_clock.get_ticks() - self.last_hit > hit_cooldown):
                 self.hit = False
 
         # Check what action player is performing
@@ -195,10 +183,10 @@ class Character():
         self.image = self.animation_list[self.action][self.frame_index]
         # Check if enough time has passed since the last update
         # If yes, animate the next frame
-        if pygame.time.get_ticks() - self.update_time > animation_cooldown:
+        if sim_clock.get_ticks() - self.update_time > animation_cooldown:
             self.frame_index += 1
             self.frame_index %= len(self.animation_list[self.action])
-            self.update_time = pygame.time.get_ticks()
+            self.update_time = sim_clock.get_ticks()
 
     # Update the animation state (between idle and running)
     def update_action(self, new_action):
@@ -207,22 +195,23 @@ class Character():
             self.action = new_action
             # Update animation settings, start cycling the images from beginning
             self.frame_index = 0
-            self.update_time = pygame.time.get_ticks()
+            self.update_time = sim_clock.get_ticks()
 
     # Draw player on the surface (which is the game screen) on the rectangle.
     # Rectangle is used for collisions
-    def draw(self, surface):
+    def draw(self, surface, camera):
+        # Position of the character on the screen
+        screen_rect = camera.apply(self.rect)
         # Flip image in x-axis with self.flip
-        flipped_image = pygame.transform.flip(self.image, self.flip, False)
+        flipped_image = transform_cache.flip(self.image, self.flip)
         # The elf image has a blank space at top, fix it by offsetting image.
         # Because we are scaling the images, also scale the offset
         if self.char_type == 0:
-            surface.blit(flipped_image, (self.rect.x, self.rect.y - constants.OFFSET * constants.SCALE))
+            surface.blit(flipped_image, (screen_rect.x, screen_rect.y - constants.OFFSET * constants.SCALE))
         else:
             # If an enemy dies, flip the enemy image vertically and rotate
             if not self.alive:
-                flipped_image = pygame.transform.rotate(self.image, 30)
-                flipped_image = pygame.transform.flip(flipped_image, False, True)
-            surface.blit(flipped_image, self.rect)
+                flipped_image = transform_cache.rotate(self.image, 30, False, True)
+            surface.blit(flipped_image, screen_rect)
         # Draw collision rectangle of characters
-        pygame.draw.rect(surface, constants.RED, self.rect, 1)
+        pygame.draw.rect(surface, constants.RED, screen_rect, 1)
@@ -0,0 +1,77 @@
+from collections import OrderedDict
+import pygame
+import constants
+
+
+# The floor and wall tiles never change after a level is loaded, so instead of blitting them one by one
+# every frame, bake them into big chunk surfaces (CHUNK_TILES x CHUNK_TILES tiles each).
+# Chunks are built when they get close to the screen and the least recently used ones are
+# thrown away when the cache would use more memory than the budget.
+class ChunkCache():
+    def __init__(self, world, chunk_tiles=constants.CHUNK_TILES, memory_budget=constants.CHUNK_MEMORY_BUDGET):
+        self.world = world
+        self.chunk_size = chunk_tiles * constants.TILE_SIZE
+        # 4 bytes per pixel, keep at least enough chunks to cover the screen
+        chunk_bytes = self.chunk_size * self.chunk_size * 4
+        self.max_chunks = max(9, memory_budget // chunk_bytes)
+        # (column, row) of chunk -> surface, or None if the chunk has no tiles
+        self.chunks = OrderedDict()
+
+    # Tiles are centered on their coordinates, so chunks start half a tile before the first tile
+    def chunk_rect(self, column, row):
+        half_tile = constants.TILE_SIZE // 2
+        return pygame.Rect(column * self.chunk_size - half_tile, row * self.chunk_size - half_tile,
+                           self.chunk_size, self.chunk_size)
+
+    # Return the (column, row) of every chunk that intersects the rect
+    def chunks_in(self, rect):
+        half_tile = constants.TILE_SIZE // 2
+        first_column = (rect.left + half_tile) // self.chunk_size
+        first_row = (rect.top + half_tile) // self.chunk_size
+        last_column = (rect.right - 1 + half_tile) // self.chunk_size
+        last_row = (rect.bottom - 1 + half_tile) // self.chunk_size
+        return [(column, row) for row in range(first_row, last_row + 1)
+                for column in range(first_column, last_column + 1)]
+
+    def build(self, key):
+        chunk_rect = self.chunk_rect(*key)
+        tiles = self.world.visible_tiles(chunk_rect)
+        if not tiles:
+            return None
+        chunk = pygame.Surface(chunk_rect.size)
+        # Converting to the display format makes blitting faster
+        if pygame.display.get_surface():
+            chunk = chunk.convert()
+        chunk.fill(constants.BACKGROUND)
+        for tile in tiles:
+            chunk.blit(tile[0], tile[1].move(-chunk_rect.x, -chunk_rect.y))
+        return chunk
+
+    def get(self, key):
+        if key in self.chunks:
+            # Mark as recently used
+            self.chunks.move_to_end(key)
+            return self.chunks[key]
+        chunk = self.build(key)
+        self.chunks[key] = chunk
+        # Evict the least recently used chunks
+        while len(self.chunks) > self.max_chunks:
+            self.chunks.popitem(last=False)
+        return chunk
+
+    def draw(self, surface, camera):
+        chunks_drawn = 0
+        for key in self.chunks_in(camera.rect):
+            chunk = self.get(key)
+            if chunk:
+                chunk_rect = self.chunk_rect(*key)
+                surface.blit(chunk, camera.to_screen(chunk_rect.x, chunk_rect.y))
+                chunks_drawn += 1
+
+        # Build at most one chunk per frame that is about to come onto the screen
+        for key in self.chunks_in(camera.rect.inflate(constants.TILE_SIZE * 8, constants.TILE_SIZE * 8)):
+            if key not in self.chunks:
+                self.get(key)
+                break
+
+        return chunks_drawn
@@ -1,4 +1,10 @@
-FPS = 60  # Limit FPS so that the actions runs smoother in game
+FPS = 60  # Simulation steps per second, speeds and cooldowns are per step
+RENDER_FPS = 60  # Limit of drawn frames per second, the game runs at the same speed with any limit
+MAX_SIM_STEPS = 5  # Most simulation steps per drawn frame, a slower computer slows down the game instead
+PRECISE_FRAME_PACING = True  # Busy wait for the next frame while playing, more exact than sleeping but uses more CPU
+IDLE_WAIT_TIMEOUT = 500  # (in ms) Static screens (menu, pause) wait this long for input before looping again
+REPLAY_PATH = "replays/last_game.replay"  # The input of the last game is recorded here (None to not record)
+DIRTY_RECTS = True  # Only send the changed parts of the screen to the display
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 800
 SCALE = 3  # Scale images
@@ -14,6 +20,29 @@ TILE_TYPES = 18
 ROWS = 150
 COLUMNS = 150
 
+# The static map is pre-rendered in chunks of CHUNK_TILES x CHUNK_TILES tiles
+CHUNK_TILES = 16
+CHUNK_MEMORY_BUDGET = 64 * 1024 * 1024  # Bytes
+
+# Enemy AI scheduling
+AI_REGION_TILES = 16  # Enemies are grouped in square regions of this many tiles
+AI_WAKE_REGIONS = 2  # Enemies within this many regions of the player are awake, the others are dormant
+# (in pixels) Awake enemies closer than this to the player run their AI every frame.
+# Covers the whole screen: the farthest screen corner is about 850 px from the player (scroll threshold 200)
+AI_ACTIVE_RANGE = 900
+AI_REDUCED_INTERVAL = 4  # Other awake enemies run their AI every 4th frame and move 4 steps at once
+ARROW_POOL_SIZE = 64  # Arrows and fireballs are created up front and reused
+FIREBALL_POOL_SIZE = 64
+DAMAGE_TEXT_POOL_SIZE = 64
+RAPID_FIRE = False  # Keep shooting while the mouse button is held
+PIERCING_ARROWS = False  # Arrows fly through enemies
+SPATIAL_HASH_CELL_SIZE = 96  # (in pixels) Cell size of the buckets used to find characters near a position
+FLOW_FIELD_RADIUS = 16  # (in tiles) Enemies that can't see the player follow paths around walls within this distance
+# Run the AI of many enemies at once with NumPy (if it is installed). Off because it was slower than the AI of
+# each enemy on its own with 50 to 400 enemies, measure it with python benchmark.py --ai 50 200 400
+BATCH_AI = False
+BATCH_AI_MIN_ENEMIES = 32  # Levels with fewer enemies run the AI of each enemy on its own
+
 SCROLL_THRESH = 200  # (in pixels) The player is not always centered in the screen
 ENEMY_RANGE_TO_PLAYER = 50
 ATTACK_RANGE = 60  # Enemies can attack within 60px
@@ -0,0 +1,28 @@
+import pygame
+import constants
+
+
+# Collects the parts of the screen that changed in a frame, only those are sent to the display.
+# Static screens (main menu, pause screen) are drawn once and then nothing is sent until they change,
+# the game itself scrolls, so it marks the whole screen every frame.
+# Only the death fade (the world stopped) and the performance overlay mark parts of the screen
+class DirtyRects():
+    def __init__(self, enabled=constants.DIRTY_RECTS):
+        self.enabled = enabled
+        self.rects = []
+        self.full_screen = False
+
+    def add(self, rect):
+        self.rects.append(pygame.Rect(rect))
+
+    def add_full_screen(self):
+        self.full_screen = True
+
+    # Update the changed parts of the display
+    def present(self):
+        if self.full_screen or (not self.enabled and self.rects):
+            pygame.display.update()
+        elif self.rects:
+            pygame.display.update(self.rects)
+        self.rects = []
+        self.full_screen = False
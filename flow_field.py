@@ -0,0 +1,71 @@
+from collections import deque
+import constants
+
+
+# Shared path finding towards the player for all enemies.
+# A breadth first search runs from the player's tile over the tiles that are not walls,
+# up to FLOW_FIELD_RADIUS steps away. Every reached tile stores the neighbour tile that is one step closer
+# to the player, so an enemy only has to look up its own tile to walk around walls.
+# The search only runs again when the player moves to another tile.
+class FlowField():
+    # walls is a bitmap of the tiles enemies can't walk on (one byte per tile, row by row)
+    def __init__(self, columns=constants.COLUMNS, rows=constants.ROWS, radius=constants.FLOW_FIELD_RADIUS, walls=None):
+        self.columns = columns
+        self.rows = rows
+        self.radius = radius
+        self.walls = bytearray(walls) if walls else bytearray(columns * rows)
+        # Tile index -> index of the next tile towards the player, -1 if the tile was not reached
+        self.next_tile = [-1] * (columns * rows)
+        # Tiles reached by the last search, only these have to be reset
+        self.reached = []
+        self.target_cell = None
+
+    def update(self, target_cell):
+        if target_cell == self.target_cell:
+            return
+        self.target_cell = target_cell
+        next_tile = self.next_tile
+        for index in self.reached:
+            next_tile[index] = -1
+        self.reached = []
+
+        column, row = target_cell
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            return
+        columns = self.columns
+        walls = self.walls
+        start = row * columns + column
+        # The player's tile points to itself
+        next_tile[start] = start
+        self.reached.append(start)
+        queue = deque([(start, 0)])
+        while queue:
+            index, distance = queue.popleft()
+            if distance == self.radius:
+                continue
+            column = index % columns
+            # Left, right, up and down neighbours (no diagonals, enemies would get stuck on wall corners)
+            neighbours = []
+            if column > 0:
+                neighbours.append(index - 1)
+            if column < columns - 1:
+                neighbours.append(index + 1)
+            if index >= columns:
+                neighbours.append(index - columns)
+            if index < len(walls) - columns:
+                neighbours.append(index + columns)
+            for neighbour in neighbours:
+                if next_tile[neighbour] == -1 and not walls[neighbour]:
+                    next_tile[neighbour] = index
+                    self.reached.append(neighbour)
+                    queue.append((neighbour, distance + 1))
+
+    # Return the (column, row) of the next tile towards the player, None if the player is too far away
+    def next_cell(self, cell):
+        column, row = cell
+        if not (0 <= column < self.columns and 0 <= row < self.rows):
+            return None
+        index = self.next_tile[row * self.columns + column]
+        if index == -1:
+            return None
+        return index % self.columns, index // self.columns
@@ -0,0 +1,29 @@
+import time
+
+
+# Measures how long each phase of a frame takes (player, enemies, draw...)
+# When it is not enabled, marking a phase does nothing
+class FrameTimer():
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        # Phase name -> seconds spent in the phase this frame
+        self.phase_times = {}
+        self.frame_start = 0
+        self.last_mark = 0
+
+    def start_frame(self):
+        if self.enabled:
+            self.phase_times = {}
+            self.frame_start = time.perf_counter()
+            self.last_mark = self.frame_start
+
+    # Add the time since the last mark (or the start of the frame) to the phase
+    def mark(self, phase):
+        if self.enabled:
+            now = time.perf_counter()
+            self.phase_times[phase] = self.phase_times.get(phase, 0) + now - self.last_mark
+            self.last_mark = now
+
+    # Seconds from the start of the frame to the last mark
+    def frame_time(self):
+        return self.last_mark - self.frame_start
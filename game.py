@@ -0,0 +1,357 @@
+import pygame
+import random
+import constants
+import sim_clock
+from weapon import Weapon
+from projectiles import ProjectileManager
+from spatial_hash import SpatialHash
+from pool import Pool
+from snapshot import WorldSnapshot
+import text_cache
+from items import Item
+from camera import Camera
+from level_preloader import LevelPreloader
+from frame_timer import FrameTimer
+from ai_scheduler import AIScheduler
+import batch_ai
+
+
+# Input of the player for one frame
+class Controls():
+    def __init__(self):
+        # Define player movement variables
+        self.moving_left = False
+        self.moving_right = False
+        self.moving_up = False
+        self.moving_down = False
+        # Mouse position on screen and left mouse button
+        self.mouse_pos = (0, 0)
+        self.fire = False
+
+
+# Output text onto screen by converting it to an image
+# The images are cached, a text is only rendered again if it changed
+def draw_text(surface, text, font, text_col, x, y):
+    image = text_cache.render(font, text, text_col)
+    surface.blit(image, (x, y))
+
+
+# Damage text class, damage texts are reused by a pool
+class DamageTest():
+    def __init__(self):
+        self.image = None
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.counter = 0
+        self.display_time = 0
+        self.alive = False
+
+    def show(self, x, y, image, display_time):
+        self.image = image
+        self.rect = self.image.get_rect()
+        self.rect.center = (x, y)
+        self.counter = 0
+        self.display_time = display_time
+        self.alive = True
+
+    def update(self):
+        # Move damage text up
+        self.rect.y -= 2
+        # Delete the damage display after counter value is passed
+        self.counter += 1
+        if self.counter > self.display_time:
+            self.alive = False
+
+
+# The state of a running game: the level, the player, enemies, items and projectiles.
+# It does not handle menus, fades or pygame events, so it can also be run without a window (see headless.py)
+class Game():
+    # All randomness of the game comes from one generator, so a game with the same seed and input plays the same
+    def __init__(self, assets, font, sounds, level, seed=None):
+        self.font = font
+        if seed is None:
+            seed = random.randrange(1 << 32)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.shot_fx, self.hit_fx, self.coin_fx, self.heal_fx = sounds
+
+        # Load heart images
+        self.heart_empty = assets.image("items", "heart_empty")
+        self.heart_half = assets.image("items", "heart_half")
+        self.heart_full = assets.image("items", "heart_full")
+        self.coin_images = assets.item_images()[0]
+
+        # Create player's weapon
+        self.bow = Weapon(assets.image("weapons", "bow"), constants.RAPID_FIRE, constants.PIERCING_ARROWS)
+        # Pools of arrows and fireballs
+        self.projectiles = ProjectileManager(assets.image("weapons", "arrow"), assets.image("weapons", "fireball"))
+        # The player and alive enemies by position, for arrow hits and the characters in view
+        self.character_hash = SpatialHash()
+        # Items by position, only the items near the player are checked for pick up
+        self.item_hash = SpatialHash()
+
+        # Damage texts, and the images of the damage numbers arrows can deal (10 +- 5)
+        self.damage_texts = Pool(DamageTest, constants.DAMAGE_TEXT_POOL_SIZE)
+        self.damage_images = {damage: font.render(str(damage), True, constants.RED) for damage in range(5, 16)}
+        # Create sprite group for items
+        self.item_group = pygame.sprite.Group()
+        # The info panel is drawn into an image again only if health, level or score changed
+        self.info_image = pygame.Surface((constants.SCREEN_WIDTH, 51))
+        self.info_state = None
+
+        # Level data (compiled level file or csv) is loaded and processed by the preloader,
+        # the next level is prepared in the background while the current one is played
+        self.level_preloader = LevelPreloader(assets)
+        self.level = level
+        self.level_complete = False
+        # Time spent in each phase of a frame, only measured when enabled
+        self.timer = FrameTimer()
+        # Number of map chunks and enemies drawn in the last frame
+        self.draw_stats = {"chunks": 0, "enemies": 0}
+        self.set_world(self.level_preloader.build_world(level))
+        self.level_preloader.preload(level + 1)
+
+    # Switch to a new world
+    def set_world(self, world):
+        self.item_group.empty()
+
+        self.world = world
+        # The camera follows the player, everything else stays in world coordinates
+        self.camera = Camera()
+        self.player = world.player
+        # Extract enemies from world data
+        self.enemy_list = world.character_list
+
+        # Display the score with a coin image, it is updated and drawn on its own (not in the item group)
+        self.score_coin = Item(constants.SCREEN_WIDTH - 115, 23, 0, self.coin_images, True)
+        # Add items (coin, potion etc.) from level data
+        for item in world.item_list:
+            self.item_group.add(item)
+        # The world can be built on the preloader thread while the clock keeps running,
+        # start all timers now so the game plays the same for the same input
+        now = sim_clock.get_ticks()
+        for character in [self.player] + self.enemy_list:
+            character.update_time = now
+            character.last_hit = now
+            character.last_attack = now
+        for item in world.item_list:
+            item.update_time = now
+        self.reset_world_state()
+
+        # The level as it was built, restarting the level goes back to it. The quick save is only for this world
+        self.start_snapshot = WorldSnapshot(world, self.item_group, self.camera)
+        self.quick_snapshot = None
+
+    # Reset everything that is derived from the characters and items of the world
+    # (after switching the world or restoring a snapshot)
+    def reset_world_state(self):
+        self.damage_texts.clear()
+        self.projectiles.clear()
+        self.level_complete = False
+        # Positions before the last simulation step, see save_positions()
+        self.previous_positions = {}
+        self.previous_camera = None
+        # Only enemies near the player run their AI
+        self.ai_scheduler = AIScheduler(self.enemy_list)
+        self.character_hash.rebuild([self.player] + [enemy for enemy in self.enemy_list if enemy.alive])
+        self.item_hash.rebuild(self.item_group)
+        # Levels with many enemies run the AI of all enemies at once
+        self.batch_ai = None
+        if constants.BATCH_AI and batch_ai.available() and len(self.enemy_list) >= constants.BATCH_AI_MIN_ENEMIES:
+            self.batch_ai = batch_ai.BatchAI(self.enemy_list)
+
+    # Go to the next level, wait at most timeout seconds for the preloaded world
+    def next_level(self, timeout=None):
+        self.level += 1
+        # Save hp and score across levels
+        temp_hp = self.player.health
+        temp_score = self.player.score
+        self.set_world(self.level_preloader.take(self.level, timeout))
+        self.level_preloader.preload(self.level + 1)
+        self.player.health = temp_hp
+        self.player.score = temp_score
+
+    # HP and score are not kept when the player dies.
+    # The world is put back into the state it was built in, the level is not loaded again
+    def restart_level(self):
+        self.restore(self.start_snapshot)
+
+    # Remember the state of the current level, quick_load() goes back to it
+    def quick_save(self):
+        self.quick_snapshot = WorldSnapshot(self.world, self.item_group, self.camera)
+
+    # Nothing happens if there is no quick save for the current level
+    def quick_load(self):
+        if self.quick_snapshot:
+            self.restore(self.quick_snapshot)
+
+    def restore(self, snapshot):
+        snapshot.restore(self.item_group, self.camera)
+        self.reset_world_state()
+
+    def update(self, controls):
+        self.level_complete = False
+        if not self.player.alive:
+            return
+
+        # Calculate player movement in pixels (Delta x and y, changes in direction)
+        # In pygame the top left corner of the screen is (0,0), moving up means decreasing y value.
+        dx = 0
+        dy = 0
+        if controls.moving_right:
+            dx = constants.SPEED
+        if controls.moving_left:
+            dx = -constants.SPEED
+        if controls.moving_up:
+            dy = -constants.SPEED
+        if controls.moving_down:
+            dy = constants.SPEED
+
+        # Move player
+        self.level_complete = self.player.move(dx, dy, self.world.wall_grid, self.world.exit_tile)
+        self.character_hash.update(self.player)
+        self.timer.mark("player")
+
+        # Move the camera with the player
+        self.camera.update(self.player.rect)
+        self.timer.mark("world")
+        # Update enemies, the paths to the player only change when the player moves to another tile
+        self.world.flow_field.update(self.world.wall_grid.cell_at(*self.player.rect.center))
+        scheduled_enemies, steps = self.ai_scheduler.scheduled(self.player)
+        if self.batch_ai:
+            self.batch_ai.update(scheduled_enemies, steps, self.player, self.world.line_of_sight,
+                                 self.world.flow_field, self.world.wall_grid, self.projectiles)
+        else:
+            for enemy, enemy_steps in zip(scheduled_enemies, steps):
+                enemy.ai(self.player, self.world.line_of_sight, self.world.flow_field,
+                         self.world.wall_grid, self.projectiles, enemy_steps)
+        for enemy in scheduled_enemies:
+            enemy.update()
+            self.ai_scheduler.relocate(enemy)
+            # Only enemies that run their AI can move or die
+            if enemy.alive:
+                self.character_hash.update(enemy)
+            else:
+                self.character_hash.remove(enemy)
+        self.timer.mark("enemies")
+        self.player.update()
+        # Shoot an arrow from the bow
+        arrow = self.bow.update(self.player, self.camera, controls.mouse_pos, controls.fire, self.projectiles)
+        if arrow:
+            # Play arrow shooting sound
+            self.shot_fx.play()
+        self.timer.mark("player")
+        # Move arrows and fireballs, get the damage dealt and the position of damage display
+        for damage, damage_pos in self.projectiles.update(self.player, self.character_hash, self.world.wall_grid,
+                                                          self.camera, self.rng):
+            # Display the damage at the top of enemy, not at the center
+            random_x_axis_offset = self.rng.randint(-10, 10)
+            damage_image = self.damage_images.get(damage)
+            if damage_image is None:
+                damage_image = text_cache.render(self.font, str(damage), constants.RED)
+            self.damage_texts.spawn().show(damage_pos.centerx + random_x_axis_offset, damage_pos.y, damage_image, 60)
+            # Play hit sound
+            self.hit_fx.play()
+        for damage_text in self.damage_texts:
+            damage_text.update()
+        self.damage_texts.collect()
+        self.timer.mark("projectiles")
+        for item in self.item_hash.query_rect(self.player.rect):
+            item.pick_up(self.player, self.coin_fx, self.heal_fx)
+            if not item.alive():
+                self.item_hash.remove(item)
+        # Only animate the items on the screen, the others are not seen anyway
+        for item in self.camera.visible(self.item_group):
+            item.update()
+        self.score_coin.update()
+        self.timer.mark("items")
+
+    # Remember where the moving things near the screen are before a simulation step,
+    # so draw() can draw them between their last two positions
+    def save_positions(self):
+        view = self.camera.rect.inflate(constants.TILE_SIZE * 2, constants.TILE_SIZE * 2)
+        positions = {character: character.rect.topleft for character in self.character_hash.query_rect(view)}
+        for group in (self.projectiles.arrows, self.projectiles.fireballs, self.damage_texts):
+            for thing in group:
+                positions[thing] = thing.rect.topleft
+        positions[self.bow] = self.bow.rect.topleft
+        self.previous_positions = positions
+        self.previous_camera = (self.camera.offset_x, self.camera.offset_y)
+
+    # alpha (0 to 1) is how far the time is between the previous and the last simulation step
+    def draw(self, surface, alpha=1):
+        # Move things to where they were at that time while drawing
+        current_positions = []
+        current_camera = (self.camera.offset_x, self.camera.offset_y)
+        if alpha < 1:
+            for thing, (x, y) in self.previous_positions.items():
+                current_x, current_y = thing.rect.topleft
+                thing.rect.topleft = (round(x + (current_x - x) * alpha), round(y + (current_y - y) * alpha))
+                current_positions.append((thing, (current_x, current_y)))
+            if self.previous_camera:
+                x, y = self.previous_camera
+                self.camera.offset_x = round(x + (current_camera[0] - x) * alpha)
+                self.camera.offset_y = round(y + (current_camera[1] - y) * alpha)
+
+        # Fill the screen background to clear the drawn visuals before
+        surface.fill(constants.BACKGROUND)
+
+        # Only draw what is visible on the screen
+        camera = self.camera
+        self.draw_stats["chunks"] = self.world.draw(surface, camera)
+        visible_enemies = camera.visible(self.enemy_list)
+        self.draw_stats["enemies"] = len(visible_enemies)
+        for enemy in visible_enemies:
+            enemy.draw(surface, camera)
+        self.player.draw(surface, camera)
+        self.bow.draw(surface, camera)
+        for arrow in camera.visible(self.projectiles.arrows):
+            arrow.draw(surface, camera)
+        for fireball in camera.visible(self.projectiles.fireballs):
+            fireball.draw(surface, camera)
+        for damage_text in camera.visible(self.damage_texts):
+            surface.blit(damage_text.image, camera.apply(damage_text.rect))
+        for item in camera.visible(self.item_group):
+            item.draw(surface, camera)
+        # The score coin is drawn separately on top of the info panel
+        self.draw_info(surface)
+        self.score_coin.draw(surface)
+
+        # Put things back to their current position
+        for thing, position in current_positions:
+            thing.rect.topleft = position
+        self.camera.offset_x, self.camera.offset_y = current_camera
+        self.timer.mark("draw")
+
+    # Function for displaying game info
+    def draw_info(self, surface):
+        state = (self.player.health, self.level, self.player.score)
+        if state != self.info_state:
+            self.info_state = state
+            self.draw_info_panel(self.info_image)
+        surface.blit(self.info_image, (0, 0))
+
+    def draw_info_panel(self, surface):
+        # Create a layout (Grid and a line) on top of the screen for displaying player info
+        pygame.draw.rect(surface, constants.PANEL, (0, 0, constants.SCREEN_WIDTH, 50))
+        pygame.draw.line(surface, constants.WHITE, (0, 50), (constants.SCREEN_WIDTH, 50))
+
+        # Draw lives, full HP == 5 times heart, 20 each
+        # Avoid displaying multiple half hearts
+        half_heart_drawn = False
+        for i in range(5):
+            if self.player.health >= ((i + 1) * 20):
+                # Each heart is 50px apart, 10 pixels offset, 0 near top of the screen
+                surface.blit(self.heart_full, (10 + i * 50, 0))
+            # Calculate remaining half hearts
+            elif (self.player.health % 20 > 0) and not half_heart_drawn:
+                surface.blit(self.heart_half, (10 + i * 50, 0))
+                half_heart_drawn = True
+            else:
+                surface.blit(self.heart_empty, (10 + i * 50, 0))
+        # Show level info
+        draw_text(surface, "Map: " + str(self.level), self.font, constants.WHITE, constants.SCREEN_WIDTH / 2, 15)
+        # Show score
+        draw_text(surface, f"x: {self.player.score}", self.font, constants.WHITE, constants.SCREEN_WIDTH - 100, 15)
+
+    def shutdown(self):
+        self.level_preloader.shutdown()
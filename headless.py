@@ -0,0 +1,98 @@
+import os
+import argparse
+import time
+
+# Run without a window and without an audio device
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+import pygame
+import constants
+import sim_clock
+from assets import AssetManager
+from game import Game, Controls
+from level_loader import level_exists
+import recording
+
+
+# Create a game that runs on the simulated clock, with a fixed time step of one frame.
+# Games created one after another can share an AssetManager, so images are only loaded once
+def create_game(level, seed=None, assets=None):
+    pygame.init()
+    pygame.mixer.init()
+    # Images are converted to the display format, so there still has to be a (dummy) display
+    surface = pygame.display.set_mode((constants.SCREEN_WIDTH, constants.SCREEN_HEIGHT))
+    sim_clock.use_fixed_step(1000 / constants.FPS)
+    font = pygame.font.Font("assets/fonts/AtariClassic.ttf", 20)
+    if assets is None:
+        assets = AssetManager()
+    game = Game(assets, font, assets.load_sounds(), level, seed)
+    return game, surface
+
+
+# Step the game as fast as possible.
+# get_controls(frame) returns the Controls of a frame, without it the player stands still
+# Returns the number of simulated frames, stops early when the player dies or there is no next level
+def run(game, frames, get_controls=None, surface=None):
+    controls = Controls()
+    for frame in range(frames):
+        if get_controls:
+            controls = get_controls(frame)
+        game.update(controls)
+        if surface:
+            game.draw(surface)
+        sim_clock.advance()
+
+        if game.level_complete:
+            if not level_exists(game.level + 1):
+                return frame + 1
+            game.next_level()
+        if not game.player.alive:
+            return frame + 1
+    return frames
+
+
+# Play a recorded game as fast as possible, return True if it ended in the same state as when it was recorded
+def run_replay(replay, draw=False):
+    game, surface = create_game(replay.level, replay.seed)
+    for step in range(len(replay.steps)):
+        controls, actions = replay.controls(step)
+        recording.apply_actions(game, actions)
+        game.update(controls)
+        if draw:
+            game.draw(surface)
+        sim_clock.advance()
+        if game.level_complete:
+            game.next_level()
+    same = recording.state_checksum(game) == replay.checksum
+    game.shutdown()
+    return same
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the game without a window at a fixed time step")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--frames", type=int, default=10000)
+    parser.add_argument("--draw", action="store_true", help="also draw every frame (on a surface that is not shown)")
+    parser.add_argument("--replay", metavar="FILE", help="play a recorded game instead")
+    args = parser.parse_args()
+
+    if args.replay:
+        replay = recording.load_replay(args.replay)
+        start = time.perf_counter()
+        same = run_replay(replay, args.draw)
+        duration = time.perf_counter() - start
+        steps = len(replay.steps)
+        print(f"Replayed {steps} frames ({steps / constants.FPS:.1f} s of game time) of level {replay.level} "
+              f"in {duration:.2f} s, " + ("same result as recorded" if same else "DIFFERENT result than recorded"))
+        pygame.quit()
+        raise SystemExit(0 if same else 1)
+
+    game, surface = create_game(args.level)
+    start = time.perf_counter()
+    frames = run(game, args.frames, surface=surface if args.draw else None)
+    duration = time.perf_counter() - start
+    print(f"Simulated {frames} frames ({frames / constants.FPS:.1f} s of game time) in {duration:.2f} s, "
+          f"{frames / duration:.0f} frames per second")
+    game.shutdown()
+    pygame.quit()
@@ -1,4 +1,5 @@
 import pygame.sprite
+import sim_clock
 
 
 class Item(pygame.sprite.Sprite):
@@ -7,21 +8,16 @@ class Item(pygame.sprite.Sprite):
         self.item_type = item_type  # 0: coin, 1: HP potion
         self.animation_list = animation_list
         self.frame_index = 0
-        self.update_time = pygame.time.get_ticks()
+        self.update_time = sim_clock.get_ticks()
         self.image = self.animation_list[self.frame_index]
         self.rect = self.image.get_rect()
         self.rect.center = (x, y)
         self.dummy_coin = dummy_coin
 
-    def update(self, screen_scroll, player, coin_fx, heal_fx):
-        # Don't move the coin displayed in the score
+    # Called for the items that touch the player
+    def pick_up(self, player, coin_fx, heal_fx):
+        # The coin displayed in the score is in screen coordinates, so it can't be collected
         if not self.dummy_coin:
-            # Reposition item based on screen scroll
-            self.rect.x += screen_scroll[0]
-            self.rect.y += screen_scroll[1]
-
-        # Check collision with player
-        if self.rect.colliderect(player.rect):
             # Coin collected
             if self.item_type == 0:
                 player.score += 1
@@ -36,18 +32,23 @@ class Item(pygame.sprite.Sprite):
                     # Destroy item
                     self.kill()
 
+    def update(self):
         # Set speed of animation
         animation_cooldown = 150
         self.image = self.animation_list[self.frame_index]
         # Check if enough time passed since last update
-        if pygame.time.get_ticks() - self.update_time > animation_cooldown:
+        if sim_clock.get_ticks() - self.update_time > animation_cooldown:
             self.frame_index += 1
-            self.update_time = pygame.time.get_ticks()
+            self.update_time = sim_clock.get_ticks()
         # Check if animation has finished and cycle it
         if self.frame_index >= len(self.animation_list):
             self.frame_index = 0
 
     # For sprite groups you can call the draw function of the group,
     # but for individual objects, you create your own draw function
-    def draw(self, surface):
-        surface.blit(self.image, self.rect)
+    def draw(self, surface, camera=None):
+        # The coin displayed in the score is already in screen coordinates and does not move with the camera
+        if self.dummy_coin or camera is None:
+            surface.blit(self.image, self.rect)
+        else:
+            surface.blit(self.image, camera.apply(self.rect))
@@ -0,0 +1,241 @@
+import array
+import csv
+from collections import deque
+import os
+import struct
+import sys
+import zlib
+
+# Compiled levels are stored next to the csv files as levels/levelN_data.lvl
+# Format: header (magic, version, rows, columns, crc32 of the source csv) followed by
+# one signed byte (int8) per tile, row by row. -1 means an empty tile.
+# The tile array can also be read directly with numpy.fromfile(path, numpy.int8, offset=HEADER.size)
+# After the tiles come the navigation data computed when the level is compiled (one value per tile, row by row):
+# - walls: 1 for wall tiles (7), used for collisions and line of sight
+# - blocked: 1 for tiles enemies can't walk on (walls and empty tiles), used for the flow field
+# - exit distance: uint16 number of steps to the exit (UNREACHABLE if the exit can't be reached).
+#   The player only collides with walls, so empty tiles count as walkable here. Bots follow it to the exit
+# and the spawn table: uint16 count, then (tile id, column, row) for every item, player and enemy tile (9 - 17)
+MAGIC = b"DCLV"
+VERSION = 3
+HEADER = struct.Struct("<4sBHHI")
+SPAWN = struct.Struct("<BHH")
+COUNT = struct.Struct("<H")
+UNREACHABLE = 0xFFFF
+WALL_TILE = 7
+EXIT_TILE = 8
+PLAYER_TILE = 11
+SPAWN_TILES = range(9, 18)
+
+
+# A level that can't be played (no player, no exit, or the exit can't be reached)
+class LevelError(ValueError):
+    pass
+
+
+# The tiles of a level and the navigation data computed from them
+class Level():
+    def __init__(self, rows, columns, tiles, walls, blocked, exit_distance, spawns):
+        self.rows = rows
+        self.columns = columns
+        self.tiles = tiles
+        self.walls = walls
+        self.blocked = blocked
+        self.exit_distance = exit_distance
+        # List of (tile id, column, row)
+        self.spawns = spawns
+
+    def exit_distance_at(self, column, row):
+        if 0 <= column < self.columns and 0 <= row < self.rows:
+            return self.exit_distance[row * self.columns + column]
+        return UNREACHABLE
+
+    # Return the neighbour tile that is one step closer to the exit, None if the exit can't be reached
+    def next_cell_to_exit(self, cell):
+        column, row = cell
+        distance = self.exit_distance_at(column, row)
+        if distance == UNREACHABLE or distance == 0:
+            return None
+        for next_cell in neighbours(column, row):
+            if self.exit_distance_at(*next_cell) < distance:
+                return next_cell
+        return None
+
+
+# Left, right, up and down neighbours of a tile
+def neighbours(column, row):
+    return (column - 1, row), (column + 1, row), (column, row - 1), (column, row + 1)
+
+
+# Indexes of the walkable tiles next to a tile
+def walkable_neighbours(index, rows, columns, blocked):
+    for column, row in neighbours(index % columns, index // columns):
+        if 0 <= column < columns and 0 <= row < rows and not blocked[row * columns + column]:
+            yield row * columns + column
+
+
+# Number of steps from the closest start tile to every walkable tile (breadth first search)
+def step_distances(rows, columns, blocked, start_tiles):
+    distances = array.array("H", [UNREACHABLE] * (rows * columns))
+    queue = deque(start_tiles)
+    for index in start_tiles:
+        distances[index] = 0
+    while queue:
+        index = queue.popleft()
+        for next_index in walkable_neighbours(index, rows, columns, blocked):
+            if distances[next_index] == UNREACHABLE:
+                distances[next_index] = distances[index] + 1
+                queue.append(next_index)
+    return distances
+
+
+# Compute the navigation data of the tiles, raise LevelError if the level can't be played
+def build_level(rows, columns, tiles, name="level"):
+    walls = bytearray(1 if tile == WALL_TILE else 0 for tile in tiles)
+    blocked = bytearray(1 if tile == WALL_TILE or tile < 0 else 0 for tile in tiles)
+    spawns = [(tile, index % columns, index // columns) for index, tile in enumerate(tiles) if tile in SPAWN_TILES]
+
+    players = [index for index, tile in enumerate(tiles) if tile == PLAYER_TILE]
+    exits = [index for index, tile in enumerate(tiles) if tile == EXIT_TILE]
+    if len(players) != 1:
+        raise LevelError(f"{name} needs exactly one player tile ({PLAYER_TILE}), it has {len(players)}")
+    if not exits:
+        raise LevelError(f"{name} has no exit tile ({EXIT_TILE})")
+
+    exit_distance = step_distances(rows, columns, walls, exits)
+    player = players[0]
+    if exit_distance[player] == UNREACHABLE:
+        raise LevelError(f"{name}: the exit can't be reached from the player tile "
+                         f"(column {player % columns}, row {player // columns})")
+    return Level(rows, columns, tiles, walls, blocked, exit_distance, spawns)
+
+
+def csv_path(level):
+    return f"levels/level{level}_data.csv"
+
+
+def binary_path(level):
+    return f"levels/level{level}_data.lvl"
+
+
+# Parse a csv level file, return rows, columns and the tiles as a flat int8 array
+def read_csv(path):
+    tiles = array.array("b")
+    rows = 0
+    columns = 0
+    with open(path, newline="") as csvfile:
+        reader = csv.reader(csvfile, delimiter=",")  # Numbers are separated with comma
+        for row in reader:
+            columns = len(row)
+            tiles.extend(int(tile) for tile in row)  # The read value is a string
+            rows += 1
+    return rows, columns, tiles
+
+
+# uint16 arrays are stored little endian
+def uint16_bytes(values):
+    if sys.byteorder == "big":
+        values = array.array("H", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def uint16_array(data):
+    values = array.array("H", data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+# Read a compiled level file, return the crc32 of its source csv file and the Level
+def read_binary(path):
+    with open(path, "rb") as level_file:
+        data = level_file.read()
+    magic, version, rows, columns, source_crc = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a compiled level file of version {VERSION}")
+    size = rows * columns
+    # Tiles, walls and blocked are one byte per tile, exit distance two bytes
+    spawn_offset = HEADER.size + size * 5
+    if len(data) < spawn_offset + COUNT.size:
+        raise ValueError(f"{path} is truncated")
+    offset = HEADER.size
+    tiles = array.array("b", data[offset:offset + size])
+    offset += size
+    walls = bytearray(data[offset:offset + size])
+    offset += size
+    blocked = bytearray(data[offset:offset + size])
+    offset += size
+    exit_distance = uint16_array(data[offset:offset + size * 2])
+    offset += size * 2
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    if len(data) != offset + count * SPAWN.size:
+        raise ValueError(f"{path} is truncated")
+    spawns = list(SPAWN.iter_unpack(data[offset:offset + count * SPAWN.size]))
+    return source_crc, Level(rows, columns, tiles, walls, blocked, exit_distance, spawns)
+
+
+def source_crc(path):
+    with open(path, "rb") as source_file:
+        return zlib.crc32(source_file.read())
+
+
+# Compile a csv level, broken levels raise LevelError and are not written
+def compile_level(level):
+    rows, columns, tiles = read_csv(csv_path(level))
+    level_data = build_level(rows, columns, tiles, csv_path(level))
+    with open(binary_path(level), "wb") as level_file:
+        level_file.write(HEADER.pack(MAGIC, VERSION, rows, columns, source_crc(csv_path(level))))
+        level_file.write(tiles.tobytes())
+        level_file.write(level_data.walls)
+        level_file.write(level_data.blocked)
+        level_file.write(uint16_bytes(level_data.exit_distance))
+        level_file.write(COUNT.pack(len(level_data.spawns)))
+        level_file.write(b"".join(SPAWN.pack(*spawn) for spawn in level_data.spawns))
+    return level_data
+
+
+def level_exists(level):
+    return os.path.exists(csv_path(level)) or os.path.exists(binary_path(level))
+
+
+# Read a level from the compiled file if there is one that matches the csv file,
+# otherwise compute the navigation data from the csv file
+def read_level(level):
+    if os.path.exists(binary_path(level)):
+        try:
+            crc, level_data = read_binary(binary_path(level))
+            # Don't use a compiled level that is older than its csv file
+            if not os.path.exists(csv_path(level)) or crc == source_crc(csv_path(level)):
+                return level_data
+        except (ValueError, struct.error):
+            # Compiled with an older version, or the file is broken
+            pass
+    rows, columns, tiles = read_csv(csv_path(level))
+    return build_level(rows, columns, tiles, csv_path(level))
+
+
+# Compile csv levels into the binary format:
+# python level_loader.py [level numbers, all levels if none given]
+# Levels that can't be played are rejected
+if __name__ == "__main__":
+    levels = [int(level) for level in sys.argv[1:]]
+    if not levels:
+        level = 1
+        while os.path.exists(csv_path(level)):
+            levels.append(level)
+            level += 1
+    rejected = False
+    for level in levels:
+        try:
+            level_data = compile_level(level)
+        except LevelError as error:
+            print(f"Rejected {error}")
+            rejected = True
+            continue
+        player = [(column, row) for tile, column, row in level_data.spawns if tile == PLAYER_TILE][0]
+        print(f"{csv_path(level)} -> {binary_path(level)} ({level_data.rows}x{level_data.columns}, "
+              f"exit {level_data.exit_distance_at(*player)} steps from the player, {len(level_data.spawns)} spawns)")
+    if rejected:
+        sys.exit(1)
@@ -0,0 +1,49 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from level_loader import read_level, level_exists
+from world import World
+
+
+# Loads and processes the next level in a background thread while the current level is played,
+# so that reaching the exit only has to swap in the ready world
+class LevelPreloader():
+    def __init__(self, assets):
+        self.assets = assets
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.level = None
+        self.future = None
+
+    # Load level data and create world
+    def build_world(self, level):
+        level_data = read_level(level)
+        world = World()
+        # Tile and character images are loaded when the first level needs them
+        world.process_data(level_data, self.assets.tile_list(), self.assets.item_images(), self.assets.mob_animations)
+        return world
+
+    # Start building the world of a level in the background
+    def preload(self, level):
+        if level == self.level:
+            return
+        self.level = None
+        self.future = None
+        if level_exists(level):
+            self.level = level
+            self.future = self.executor.submit(self.build_world, level)
+
+    # Return the world of the level, wait at most timeout seconds for the preloaded world.
+    # If it is not ready by then (or was never preloaded), build it now
+    def take(self, level, timeout=None):
+        world = None
+        if self.future and self.level == level:
+            try:
+                world = self.future.result(timeout)
+            except TimeoutError:
+                print(f"Preloading level {level} took too long")
+        self.level = None
+        self.future = None
+        if world is None:
+            world = self.build_world(level)
+        return world
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
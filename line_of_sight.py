@@ -0,0 +1,66 @@
+import constants
+
+
+# Checks if two tiles can see each other by walking the tile grid along the line between them.
+# Walls are kept in a compact bitmap (one byte per tile), so a check only touches the tiles on the line
+# and stops at the first wall instead of clipping the line against every wall of the level.
+class LineOfSight():
+    # walls is a bitmap of the level (one byte per tile, row by row), without it there are no walls
+    def __init__(self, columns=constants.COLUMNS, rows=constants.ROWS, walls=None):
+        self.columns = columns
+        self.rows = rows
+        self.walls = bytearray(walls) if walls else bytearray(columns * rows)
+        # Results are cached per (enemy tile, target tile) pair.
+        # Walls never change, so the cache only has to be dropped when the target moves to a new tile
+        self.cache = {}
+        self.target_cell = None
+
+    def is_wall(self, column, row):
+        # Everything outside of the map is empty
+        if 0 <= column < self.columns and 0 <= row < self.rows:
+            return self.walls[row * self.columns + column] == 1
+        return False
+
+    def is_clear(self, start_cell, target_cell):
+        if target_cell != self.target_cell:
+            self.cache.clear()
+            self.target_cell = target_cell
+        clear = self.cache.get(start_cell)
+        if clear is None:
+            clear = self.trace(start_cell, target_cell)
+            self.cache[start_cell] = clear
+        return clear
+
+    # Walk every tile the line between the centers of the two tiles passes through (DDA)
+    def trace(self, start_cell, target_cell):
+        x, y = start_cell
+        dx = target_cell[0] - x
+        dy = target_cell[1] - y
+        step_x = 1 if dx > 0 else -1
+        step_y = 1 if dy > 0 else -1
+        nx = abs(dx)
+        ny = abs(dy)
+        ix = 0
+        iy = 0
+        while ix < nx or iy < ny:
+            # Compare where the line crosses the next vertical and horizontal tile border
+            # (0.5 + ix) / nx against (0.5 + iy) / ny, multiplied out to stay in integers
+            decision = (1 + 2 * ix) * ny - (1 + 2 * iy) * nx
+            if decision == 0:
+                # The line goes exactly through a corner, it is blocked if it touches a wall on either side
+                if self.is_wall(x + step_x, y) or self.is_wall(x, y + step_y):
+                    return False
+                x += step_x
+                y += step_y
+                ix += 1
+                iy += 1
+            elif decision < 0:
+                x += step_x
+                ix += 1
+            else:
+                y += step_y
+                iy += 1
+            # Return early on the first wall
+            if self.is_wall(x, y):
+                return False
+        return True
@@ -1,13 +1,14 @@
+import os
 import pygame
 from pygame import mixer
-import random
-import csv
 import constants
-from character import Character
-from weapon import Weapon
-from items import Item
-from world import World
 from button import Button
+from assets import AssetManager
+from game import Game, Controls
+from perf_overlay import PerfOverlay
+from dirty_rects import DirtyRects
+import sim_clock
+from recording import Recorder, RESTART, QUICK_SAVE, QUICK_LOAD
 
 # TODO: Make code modular (like setting HP and damage of things in classes), use inheritance
 # items that buffs player
@@ -24,174 +25,42 @@ pygame.display.set_caption(game_name)
 # Create clock for maintaining frame rate
 clock = pygame.time.Clock()
 
+# The game is simulated in fixed steps of SIM_STEP ms, independent of the frame rate.
+# lag is the time that passed but was not simulated yet
+SIM_STEP = 1000 / constants.FPS
+sim_clock.use_fixed_step(SIM_STEP)
+lag = 0
+
 # Select game map
 level = 3
 start_game = False
 pause_game = False
 start_intro = False
 
-# The camera should follow the player
-# But the camera is not always centered to the player
-# The maximum space between the player and the edge of screen is constants.SCROLL_THRESH
-screen_scroll = [0, 0]
-
-# Define player movement variables
-moving_left = False
-moving_right = False
-moving_up = False
-moving_down = False
+# Player input (movement keys and mouse)
+controls = Controls()
 
 # Define font
 FONT_SIZE = 20
 font = pygame.font.Font("assets/fonts/AtariClassic.ttf", FONT_SIZE)
 
 
-# Scale the image by the given constant
-def scale_img(image, scale):
-    w = image.get_width()
-    h = image.get_height()
-    return pygame.transform.scale(image, (w * scale, h * scale))
-
-
-# Load music and sounds
-pygame.mixer.music.load("assets/audio/music.wav")
-pygame.mixer.music.set_volume(0.3)  # Set volume
-# pygame.mixer.music.play(-1, 0.0, 5000)  # -1: run as loop, 0.0: start point of audio, 5000 ms fade in effect
+# Load images from the asset pack (or the image files if there is no pack)
+# Tile and character images are only loaded when a level uses them
+assets = AssetManager()
 
-shot_fx = pygame.mixer.Sound("assets/audio/arrow_shot.mp3")
-shot_fx.set_volume(0.5)
-hit_fx = pygame.mixer.Sound("assets/audio/arrow_hit.wav")
-hit_fx.set_volume(0.5)
-coin_fx = pygame.mixer.Sound("assets/audio/coin.wav")
-coin_fx.set_volume(0.5)
-heal_fx = pygame.mixer.Sound("assets/audio/heal.wav")
-heal_fx.set_volume(0.5)
+# Music and sounds are loaded when the game starts
+# assets.play_music()
 
 # Load button images
-start_img = scale_img(pygame.image.load(f"assets/images/buttons/button_start.png").convert_alpha(), constants.BUTTON_SCALE)
-restart_img = scale_img(pygame.image.load(f"assets/images/buttons/button_restart.png").convert_alpha(), constants.BUTTON_SCALE)
-exit_img = scale_img(pygame.image.load(f"assets/images/buttons/button_exit.png").convert_alpha(), constants.BUTTON_SCALE)
-resume_img = scale_img(pygame.image.load(f"assets/images/buttons/button_resume.png").convert_alpha(), constants.BUTTON_SCALE)
-
-# Load heart images
-heart_empty = scale_img(pygame.image.load(f"assets/images/items/heart_empty.png").convert_alpha(), constants.ITEM_SCALE)
-heart_half = scale_img(pygame.image.load(f"assets/images/items/heart_half.png").convert_alpha(),
-                       constants.ITEM_SCALE)
-heart_full = scale_img(pygame.image.load(f"assets/images/items/heart_full.png").convert_alpha(),
-                       constants.ITEM_SCALE)
-
-# Load coin images
-coin_images = []
-for x in range(4):
-    img = scale_img(pygame.image.load(f"assets/images/items/coin_f{x}.png").convert_alpha(), constants.ITEM_SCALE)
-    coin_images.append(img)
-
-# Load potion image
-red_potion = scale_img(pygame.image.load(f"assets/images/items/potion_red.png").convert_alpha(), constants.POTION_SCALE)
-
-item_images = []
-item_images.append(coin_images)
-item_images.append(red_potion)
-
-# Load weapon images and scale it
-bow_image = scale_img(pygame.image.load(f"assets/images/weapons/bow.png").convert_alpha(), constants.WEAPON_SCALE)
-arrow_image = scale_img(pygame.image.load(f"assets/images/weapons/arrow.png").convert_alpha(), constants.WEAPON_SCALE)
-fireball_image = scale_img(pygame.image.load(f"assets/images/weapons/fireball.png").convert_alpha(),
-                           constants.FIREBALL_SCALE)
-
-# Load tile map images
-tile_list = []
-for x in range(constants.TILE_TYPES):
-    tile_image = pygame.image.load(f"assets/images/tiles/{x}.png").convert_alpha()
-    tile_image = pygame.transform.scale(tile_image, (constants.TILE_SIZE, constants.TILE_SIZE))
-    tile_list.append(tile_image)
-
-# Load character images of all mob types and of all animation types
-mob_animations = []
-mob_types = ["elf", "imp", "skeleton", "goblin", "muddy", "tiny_zombie", "big_demon"]
-animation_types = ["idle", "run"]
-for mob in mob_types:
-    # Load the animations into an animation list
-    animation_list = []
-    for animation in animation_types:
-        # Reset temporary list of images
-        temp_list = []
-        for i in range(4):
-            # Load image, match the game window, alpha is for transparency
-            img = pygame.image.load(f"assets/images/characters/{mob}/{animation}/{i}.png").convert_alpha()
-            # Scale the player image
-            img = scale_img(img, constants.SCALE)
-            temp_list.append(img)
-        animation_list.append(temp_list)
-    mob_animations.append(animation_list)
-
-
-# Function for displaying game info
-def draw_info():
-    # Create a layout (Grid and a line) on top of the screen for displaying player info
-    pygame.draw.rect(screen, constants.PANEL, (0, 0, constants.SCREEN_WIDTH, 50))
-    pygame.draw.line(screen, constants.WHITE, (0, 50), (constants.SCREEN_WIDTH, 50))
-
-    # Draw lives, full HP == 5 times heart, 20 each
-    # Avoid displaying multiple half hearts
-    half_heart_drawn = False
-    for i in range(5):
-        if player.health >= ((i + 1) * 20):
-            # Each heart is 50px apart, 10 pixels offset, 0 near top of the screen
-            screen.blit(heart_full, (10 + i * 50, 0))
-        # Calculate remaining half hearts
-        elif (player.health % 20 > 0) and not half_heart_drawn:
-            screen.blit(heart_half, (10 + i * 50, 0))
-            half_heart_drawn = True
-        else:
-            screen.blit(heart_empty, (10 + i * 50, 0))
-    # Show level info
-    draw_text("Map: " + str(level), font, constants.WHITE, constants.SCREEN_WIDTH / 2, 15)
-    # Show score
-    draw_text(f"x: {player.score}", font, constants.WHITE, constants.SCREEN_WIDTH - 100, 15)
-
-
-# Output text onto screen by converting it to an image
-def draw_text(text, font, text_col, x, y):
-    image = font.render(text, True, text_col)
-    screen.blit(image, (x, y))
+start_img = assets.image("buttons", "start")
+restart_img = assets.image("buttons", "restart")
+exit_img = assets.image("buttons", "exit")
+resume_img = assets.image("buttons", "resume")
 
 
-# Switch to new level
-def reset_level():
-    damage_text_group.empty()
-    arrow_group.empty()
-    item_group.empty()
-    fireball_group.empty()
-
-    # Create empty tile list
-    data = []
-    for row in range(constants.ROWS):
-        # -1 means an empty tile
-        r = [-1] * constants.COLUMNS
-        data.append(r)
-
-    return data
-
-
-# Create empty tile list with the specified size in constants.py
-# So that we can override the empty map with created csv files
-world_data = []
-for row in range(constants.ROWS):
-    # -1 means an empty tile
-    r = [-1] * constants.COLUMNS
-    world_data.append(r)
-
 # Alternative program to create maps: Tiled
 
-# Load level data and create world
-with open(f"levels/level{level}_data.csv", newline="") as csvfile:
-    reader = csv.reader(csvfile, delimiter=",")  # Numbers are separated with comma
-    # Use enumerate to keep track of index numbers
-    for x, row in enumerate(reader):
-        for y, tile in enumerate(row):
-            world_data[x][y] = int(tile)  # The read value is a string
-
 
 # Split entire screen into a grid by drawing white lines
 def draw_grid():
@@ -202,28 +71,6 @@ def draw_grid():
                          (constants.SCREEN_WIDTH, x * constants.TILE_SIZE))
 
 
-# Damage text class
-class DamageTest(pygame.sprite.Sprite):
-    def __init__(self, x, y, damage, color, display_time):
-        pygame.sprite.Sprite.__init__(self)
-        self.image = font.render(damage, True, color)
-        self.rect = self.image.get_rect()
-        self.rect.center = (x, y)
-        self.counter = 0
-        self.display_time = display_time
-
-    def update(self):
-        # Reposition text based on screen scroll
-        self.rect.x += screen_scroll[0]
-        self.rect.y += screen_scroll[1]
-        # Move damage text up
-        self.rect.y -= 2
-        # Delete the damage display after counter value is passed
-        self.counter += 1
-        if self.counter > self.display_time:
-            self.kill()
-
-
 # Handle screen fade (Transition between levels)
 class ScreenFade():
     def __init__(self, direction, color, speed):
@@ -232,9 +79,10 @@ class ScreenFade():
         self.speed = speed
         self.fade_counter = 0
 
-    def fade(self):
+    # steps is the number of simulation steps since the last frame
+    def fade(self, steps=1):
         fade_complete = False
-        self.fade_counter += self.speed
+        self.fade_counter += self.speed * steps
         # Whole screen fade
         if self.direction == 1:
             pygame.draw.rect(screen, self.color, (0 - self.fade_counter, 0, constants.SCREEN_WIDTH // 2,
@@ -255,34 +103,23 @@ class ScreenFade():
         return fade_complete
 
 
-world = World()
-world.process_data(world_data, tile_list, item_images, mob_animations)
-
-# Create player
-player = world.player
-
-# Create player's weapon
-bow = Weapon(bow_image, arrow_image)
-
-# Extract enemies from world data
-enemy_list = world.character_list
+# The game (world, player, enemies...) is created when the start button is pressed
+game = None
+# Records the input of every simulation step, play it with headless.py --replay
+recorder = None
+# Level restart, quick save and quick load since the last simulation step (flags of the recording module)
+actions = 0
 
-# Create sprite groups for multiple arrows etc.
-damage_text_group = pygame.sprite.Group()
-arrow_group = pygame.sprite.Group()
-item_group = pygame.sprite.Group()
-fireball_group = pygame.sprite.Group()
+# Performance overlay (toggle with F3)
+perf_overlay = PerfOverlay()
 
-# Display the score with a coin image
-score_coin = Item(constants.SCREEN_WIDTH - 115, 23, 0, coin_images, True)
-item_group.add(score_coin)
-
-# Add items (coin, potion etc.) from level data
-for item in world.item_list:
-    item_group.add(item)
-
-# coin = Item(400, 400, 0, coin_images)
-# item_group.add(coin)
+# Changed parts of the screen, and the static screen ("menu", "pause" or "death") that is currently shown.
+# A static screen is drawn once, after that the loop only checks the buttons
+dirty_rects = DirtyRects()
+shown_screen = None
+# The screen does not show the last frame of the world anymore (the window was covered or restored,
+# a static screen or the performance overlay was drawn over it), the next frame has to be drawn completely
+full_redraw = False
 
 # Create screen fades
 intro_fade = ScreenFade(1, constants.BLACK, 4)
@@ -299,196 +136,194 @@ resume_button = Button(constants.SCREEN_WIDTH // 2 - 175, constants.SCREEN_HEIGH
 run_game_loop = True
 while run_game_loop:
 
-    # Control frame rate so that pressing a movement key won't move the player superfast
-    # The movement will be a constant move
-    clock.tick(constants.FPS)
+    # Static screens (menu, pause, death screen) don't change until there is input, so sleep until an event comes
+    # (or the timeout passes) instead of looping at full frame rate
+    events = []
+    if shown_screen:
+        events.append(pygame.event.wait(constants.IDLE_WAIT_TIMEOUT))
+        frame_time = clock.tick()
+    # Limit the frame rate, the movement is handled by the fixed simulation steps
+    elif constants.PRECISE_FRAME_PACING:
+        frame_time = clock.tick_busy_loop(constants.RENDER_FPS)
+    else:
+        frame_time = clock.tick(constants.RENDER_FPS)
+    events += pygame.event.get()
+    # A fast click can be over before the buttons check the mouse state, so also take it from the events
+    click_pos = None
+    for event in events:
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            click_pos = event.pos
+    if game:
+        game.timer.start_frame()
 
     # Show main menu
     if not start_game:
-        screen.fill(constants.MENU_BACKGROUND)
-        start_button.draw(screen)
-        if start_button.draw(screen):
+        if shown_screen != "menu":
+            screen.fill(constants.MENU_BACKGROUND)
+            start_button.draw(screen)
+            exit_button.draw(screen)
+            dirty_rects.add_full_screen()
+            shown_screen = "menu"
+        if start_button.clicked(click_pos):
             start_game = True
             start_intro = True
-        if exit_button.draw(screen):
+            shown_screen = None
+            # Load sounds and the level
+            game = Game(assets, font, assets.load_sounds(), level)
+            if constants.REPLAY_PATH:
+                recorder = Recorder(level, game.seed)
+            game.timer.enabled = perf_overlay.visible
+        if exit_button.clicked(click_pos):
             run_game_loop = False
     # Start the game when start button is pressed
     else:
         # Pause screen with resume and exit buttons
         if pause_game:
-            screen.fill(constants.MENU_BACKGROUND)
-            if resume_button.draw(screen):
+            if shown_screen != "pause":
+                screen.fill(constants.MENU_BACKGROUND)
+                resume_button.draw(screen)
+                exit_button.draw(screen)
+                dirty_rects.add_full_screen()
+                shown_screen = "pause"
+                full_redraw = True
+            if resume_button.clicked(click_pos):
                 pause_game = False
-            if exit_button.draw(screen):
+                shown_screen = None
+            if exit_button.clicked(click_pos):
                 run_game_loop = False
+        # Death screen, it does not change until the restart button is clicked
+        elif shown_screen == "death":
+            if restart_button.clicked(click_pos):
+                death_fade.fade_counter = 0
+                start_intro = True
+                shown_screen = None
+                # Put the level back into the state it was built in
+                game.restart_level()
+                actions |= RESTART
         # Resume
         else:
-            # Fill the screen background to clear the drawn visuals before
-            screen.fill(constants.BACKGROUND)
+            shown_screen = None
+            # Get mouse position on screen and mouse click, 0 is left click, 1 is middle, 2 is right click
+            controls.mouse_pos = pygame.mouse.get_pos()
+            controls.fire = pygame.mouse.get_pressed()[0]
+            game.timer.mark("input")
+
+            # Update all objects in fixed steps for the time that passed since the last frame
+            lag += frame_time
+            steps = 0
+            while lag >= SIM_STEP and steps < constants.MAX_SIM_STEPS:
+                game.save_positions()
+                if recorder:
+                    recorder.record(controls, actions)
+                actions = 0
+                game.update(controls)
+                sim_clock.advance()
+                lag -= SIM_STEP
+                steps += 1
+                # Switch the level before simulating further
+                if game.level_complete:
+                    break
+            # If the computer can't keep up, drop the time that could not be simulated
+            lag %= SIM_STEP
+            # After the player died the world does not change anymore, so while the death fade runs
+            # only the fade is drawn over the last frame and only the faded part is sent to the display
+            frozen_world = (not game.player.alive and death_fade.fade_counter > 0
+                            and not start_intro and not full_redraw)
+            # Draw everything between the last two steps, depending on how far the time is into the next step
+            if not frozen_world:
+                game.draw(screen, lag / SIM_STEP)
+                full_redraw = False
+                # The world scrolls and animates, so the whole screen changes
+                dirty_rects.add_full_screen()
 
             # Draw grid lines
             # draw_grid()
 
-            if player.alive:
-                # Calculate player movement in pixels (Delta x and y, changes in direction)
-                # In pygame the top left corner of the screen is (0,0), moving up means decreasing y value.
-                dx = 0
-                dy = 0
-                if moving_right:
-                    dx = constants.SPEED
-                if moving_left:
-                    dx = -constants.SPEED
-                if moving_up:
-                    dy = -constants.SPEED
-                if moving_down:
-                    dy = constants.SPEED
-
-                # Move player
-                screen_scroll, level_complete = player.move(dx, dy, world.obstacle_tiles, world.exit_tile)
-                # print(screen_scroll)
-
-                # Update all objects
-                world.update(screen_scroll)
-                # Update enemies
-                for enemy in enemy_list:
-                    fireball = enemy.ai(player, world.obstacle_tiles, screen_scroll, fireball_image)
-                    if fireball:
-                        fireball_group.add(fireball)
-                    if enemy.alive:
-                        enemy.update()
-                player.update()
-                # If there is an arrow, add to sprite group
-                arrow = bow.update(player)
-                if arrow:
-                    arrow_group.add(arrow)
-                    # Play arrow shooting sound
-                    shot_fx.play()
-                # Update and move arrows, get the damage dealt and the position of damage display
-                for arrow in arrow_group:
-                    damage, damage_pos = arrow.update(screen_scroll, world.obstacle_tiles, enemy_list)
-                    if damage:
-                        # Display the damage at the top of enemy, not at the center
-                        random_x_axis_offset = random.randint(-10, 10)
-                        damage_text = DamageTest(damage_pos.centerx + random_x_axis_offset, damage_pos.y, str(damage),
-                                                 constants.RED, 60)
-                        damage_text_group.add(damage_text)
-                        # Play hit sound
-                        hit_fx.play()
-                damage_text_group.update()
-                fireball_group.update(screen_scroll, player)
-                item_group.update(screen_scroll, player, coin_fx, heal_fx)
-
-            # Draw on screen
-            world.draw(screen)
-            for enemy in enemy_list:
-                enemy.draw(screen)
-            player.draw(screen)
-            bow.draw(screen)
-            for arrow in arrow_group:
-                arrow.draw(screen)
-            for fireball in fireball_group:
-                fireball.draw(screen)
-            damage_text_group.draw(screen)
-            item_group.draw(screen)
-            draw_info()
-            score_coin.draw(screen)
-
             # Check level complete
-            if level_complete:
+            if game.level_complete:
                 start_intro = True
-                level += 1
-                world_data = reset_level()
-                # Load in level data and create world
-                # TODO: pack into function
-                with open(f"levels/level{level}_data.csv", newline="") as csvfile:
-                    reader = csv.reader(csvfile, delimiter=",")  # Numbers are separated with comma
-                    # Use enumerate to keep track of index numbers
-                    for x, row in enumerate(reader):
-                        for y, tile in enumerate(row):
-                            world_data[x][y] = int(tile)  # The read value is a string
-                world = World()
-                world.process_data(world_data, tile_list, item_images, mob_animations)
-                # Save hp and score across levels
-                temp_hp = player.health
-                temp_score = player.score
-                player = world.player
-                player.health = temp_hp
-                player.score = temp_score
-
-                enemy_list = world.character_list
-                score_coin = Item(constants.SCREEN_WIDTH - 115, 23, 0, coin_images, True)
-                item_group.add(score_coin)
-                # Add items from level data
-                for item in world.item_list:
-                    item_group.add(item)
+                # Swap in the preloaded world, if it is not ready yet wait at most as long as the intro fade takes
+                fade_time = constants.SCREEN_WIDTH / intro_fade.speed / constants.FPS
+                game.next_level(fade_time)
 
             if start_intro:
-                if intro_fade.fade():
+                if intro_fade.fade(steps):
                     start_intro = False
                     intro_fade.fade_counter = 0
 
-            # Shot death screen
-            if not player.alive:
-                if death_fade.fade():
-                    if restart_button.draw(screen):
-                        death_fade.fade_counter = 0
-                        start_intro = True
-                        # TODO: pack into function
-                        world_data = reset_level()
-                        # Load in level data and create world
-                        with open(f"levels/level{level}_data.csv", newline="") as csvfile:
-                            reader = csv.reader(csvfile, delimiter=",")  # Numbers are separated with comma
-                            # Use enumerate to keep track of index numbers
-                            for x, row in enumerate(reader):
-                                for y, tile in enumerate(row):
-                                    world_data[x][y] = int(tile)  # The read value is a string
-                        world = World()
-                        world.process_data(world_data, tile_list, item_images, mob_animations)
-                        # HP and score saving is handled different when player dies
-                        # temp_hp = player.health
-                        # temp_score = player.score
-                        player = world.player
-                        # player.health = temp_hp
-                        # player.score = temp_score
-                        enemy_list = world.character_list
-                        score_coin = Item(constants.SCREEN_WIDTH - 115, 23, 0, coin_images, True)
-                        item_group.add(score_coin)
-                        # Add items from level data
-                        for item in world.item_list:
-                            item_group.add(item)
+            # Shot death screen, once the fade is over it is a static screen
+            if not game.player.alive:
+                if death_fade.fade(steps):
+                    restart_button.draw(screen)
+                    shown_screen = "death"
+                    dirty_rects.add_full_screen()
+                else:
+                    dirty_rects.add((0, 0, constants.SCREEN_WIDTH, 9 + death_fade.fade_counter))
+
+            overlay_rect = perf_overlay.draw(screen, game, clock)
+            if overlay_rect:
+                dirty_rects.add(overlay_rect)
 
     # Event handler
     # Iterate through events
-    for event in pygame.event.get():
+    for event in events:
         # Check if the user closes the game window
         if event.type == pygame.QUIT:
             run_game_loop = False
+        # The window was covered or restored, draw the static screen again
+        if event.type == pygame.WINDOWEXPOSED:
+            shown_screen = None
+            full_redraw = True
         # Keyboard presses
         # For movement
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_a:
-                moving_left = True
+                controls.moving_left = True
             if event.key == pygame.K_d:
-                moving_right = True
+                controls.moving_right = True
             if event.key == pygame.K_w:
-                moving_up = True
+                controls.moving_up = True
             if event.key == pygame.K_s:
-                moving_down = True
+                controls.moving_down = True
             if event.key == pygame.K_ESCAPE:
                 pause_game = True
+            if event.key == pygame.K_F3:
+                perf_overlay.toggle(game)
+                full_redraw = True
+            # Quick save and quick load of the current level
+            if game and start_game and not pause_game:
+                if event.key == pygame.K_F5:
+                    game.quick_save()
+                    actions |= QUICK_SAVE
+                if event.key == pygame.K_F9:
+                    game.quick_load()
+                    death_fade.fade_counter = 0
+                    shown_screen = None
+                    actions |= QUICK_LOAD
         # Keyboard releases
         # so that the player won't keep moving after pressing a key
         if event.type == pygame.KEYUP:
             if event.key == pygame.K_a:
-                moving_left = False
+                controls.moving_left = False
             if event.key == pygame.K_d:
-                moving_right = False
+                controls.moving_right = False
             if event.key == pygame.K_w:
-                moving_up = False
+                controls.moving_up = False
             if event.key == pygame.K_s:
-                moving_down = False
+                controls.moving_down = False
 
-    # Update the drawn things
-    pygame.display.update()
+    if game:
+        game.timer.mark("input")
 
+    # Update the drawn things
+    dirty_rects.present()
+    if game:
+        game.timer.mark("display")
+        perf_overlay.record(game.timer)
+
+if recorder:
+    os.makedirs(os.path.dirname(constants.REPLAY_PATH), exist_ok=True)
+    recorder.save(constants.REPLAY_PATH, game)
+if game:
+    game.shutdown()
 pygame.quit()
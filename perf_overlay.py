@@ -0,0 +1,65 @@
+from collections import deque
+import pygame
+import constants
+
+# Phases of the main loop in the order they happen in a frame
+PHASES = ["input", "player", "world", "enemies", "projectiles", "items", "draw", "display"]
+GRAPH_FRAMES = 120
+GRAPH_HEIGHT = 40
+FRAME_BUDGET = 1000 / constants.FPS  # ms
+
+
+# Shows FPS, a graph of the last frame times, the time of each phase and entity counts under the info panel.
+# Toggle it with F3. The frame timer of the game only measures while the overlay is visible
+class PerfOverlay():
+    def __init__(self):
+        self.visible = False
+        self.font = pygame.font.Font("assets/fonts/AtariClassic.ttf", 8)
+        self.frame_times = deque(maxlen=GRAPH_FRAMES)
+        self.phase_times = {}
+
+    def toggle(self, game):
+        self.visible = not self.visible
+        self.frame_times.clear()
+        self.phase_times = {}
+        if game:
+            game.timer.enabled = self.visible
+
+    # Keep the times of the last finished frame
+    def record(self, timer):
+        if self.visible:
+            self.frame_times.append(timer.frame_time() * 1000)
+            self.phase_times = timer.phase_times
+
+    # Returns the rect of the drawn panel (None if the overlay is hidden)
+    def draw(self, surface, game, clock):
+        if not self.visible:
+            return
+        lines = [f"FPS {clock.get_fps():.0f}"]
+        for phase in PHASES:
+            lines.append(f"{phase:<12}{self.phase_times.get(phase, 0) * 1000:6.2f} ms")
+        stats = game.draw_stats
+        lines.append(f"chunks drawn  {stats['chunks']}")
+        lines.append(f"enemies drawn {stats['enemies']}")
+        lines.append(f"enemies alive {sum(1 for enemy in game.enemy_list if enemy.alive)}")
+        lines.append(f"arrows        {len(game.projectiles.arrows)}")
+        lines.append(f"fireballs     {len(game.projectiles.fireballs)}")
+        lines.append(f"damage texts  {len(game.damage_texts)}")
+
+        # Panel under the info panel on the left side of the screen
+        line_height = 12
+        panel = pygame.Rect(0, 51, 200, len(lines) * line_height + GRAPH_HEIGHT + 14)
+        pygame.draw.rect(surface, constants.PANEL, panel)
+        for i, line in enumerate(lines):
+            surface.blit(self.font.render(line, False, constants.WHITE), (6, panel.y + 4 + i * line_height))
+
+        # Frame time graph, the red line is the time one frame can take at constants.FPS
+        graph_bottom = panel.bottom - 6
+        scale = GRAPH_HEIGHT / (FRAME_BUDGET * 2)
+        for i, frame_time in enumerate(self.frame_times):
+            height = min(GRAPH_HEIGHT, int(frame_time * scale) + 1)
+            color = constants.RED if frame_time > FRAME_BUDGET else constants.WHITE
+            pygame.draw.line(surface, color, (6 + i, graph_bottom), (6 + i, graph_bottom - height))
+        budget_y = graph_bottom - int(FRAME_BUDGET * scale)
+        pygame.draw.line(surface, constants.RED, (6, budget_y), (6 + GRAPH_FRAMES, budget_y))
+        return panel
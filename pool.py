@@ -0,0 +1,37 @@
+# Keeps objects of one type (projectiles, damage texts) that are reused instead of created for every use.
+# Objects are created up front, new ones are only created when more objects are in use than the pool size.
+# An object is in use until its alive attribute is set to False
+class Pool():
+    def __init__(self, create, size):
+        self.create = create
+        self.free = [create() for i in range(size)]
+        self.active = []
+
+    def spawn(self):
+        if self.free:
+            thing = self.free.pop()
+        else:
+            thing = self.create()
+        self.active.append(thing)
+        return thing
+
+    # Return the objects that are not alive anymore to the pool
+    def collect(self):
+        active = []
+        for thing in self.active:
+            if thing.alive:
+                active.append(thing)
+            else:
+                self.free.append(thing)
+        self.active = active
+
+    def clear(self):
+        for thing in self.active:
+            thing.alive = False
+        self.collect()
+
+    def __iter__(self):
+        return iter(self.active)
+
+    def __len__(self):
+        return len(self.active)
@@ -0,0 +1,38 @@
+import constants
+from weapon import Arrow, Fireball
+from pool import Pool
+
+
+# Arrows of the player and fireballs of the bosses
+class ProjectileManager():
+    def __init__(self, arrow_image, fireball_image):
+        self.arrows = Pool(lambda: Arrow(arrow_image), constants.ARROW_POOL_SIZE)
+        self.fireballs = Pool(lambda: Fireball(fireball_image), constants.FIREBALL_POOL_SIZE)
+
+    def shoot_arrow(self, x, y, angle, piercing=False):
+        arrow = self.arrows.spawn()
+        arrow.launch(x, y, angle, piercing)
+        return arrow
+
+    def shoot_fireball(self, x, y, target_x, target_y):
+        fireball = self.fireballs.spawn()
+        fireball.launch(x, y, target_x, target_y)
+        return fireball
+
+    # Move all projectiles, return (damage, enemy rect) for every enemy hit by an arrow
+    # characters is the spatial hash of the player and the enemies
+    def update(self, player, characters, wall_grid, camera, rng):
+        hits = []
+        for arrow in self.arrows:
+            damage, damage_pos = arrow.update(wall_grid, characters, camera, rng)
+            if damage:
+                hits.append((damage, damage_pos))
+        for fireball in self.fireballs:
+            fireball.update(player, camera)
+        self.arrows.collect()
+        self.fireballs.collect()
+        return hits
+
+    def clear(self):
+        self.arrows.clear()
+        self.fireballs.clear()
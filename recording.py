@@ -0,0 +1,103 @@
+import struct
+import zlib
+from game import Controls
+
+# Replay file: a header, then one record per simulation step.
+# The game is deterministic for the same level, random seed and input, so the input is all that has to be stored
+MAGIC = b"DCRP"
+VERSION = 1
+# magic, version, level, random seed, number of steps, checksum of the game state after the last step
+HEADER = struct.Struct("<4sBHIII")
+# Flags (keys, mouse button, level restart) and mouse position on the screen
+STEP = struct.Struct("<Bhh")
+
+LEFT = 1
+RIGHT = 2
+UP = 4
+DOWN = 8
+FIRE = 16
+# Actions done before a step
+RESTART = 32  # The level was restarted (death screen)
+QUICK_SAVE = 64
+QUICK_LOAD = 128
+
+
+# A recorded game
+class Replay():
+    def __init__(self, level, seed, steps=None, checksum=0):
+        self.level = level
+        self.seed = seed
+        # List of (flags, mouse x, mouse y)
+        self.steps = steps or []
+        self.checksum = checksum
+
+    # Return the Controls of a step and the actions (RESTART, QUICK_SAVE, QUICK_LOAD flags) to do before it
+    def controls(self, step):
+        flags, mouse_x, mouse_y = self.steps[step]
+        controls = Controls()
+        controls.moving_left = bool(flags & LEFT)
+        controls.moving_right = bool(flags & RIGHT)
+        controls.moving_up = bool(flags & UP)
+        controls.moving_down = bool(flags & DOWN)
+        controls.fire = bool(flags & FIRE)
+        controls.mouse_pos = (mouse_x, mouse_y)
+        return controls, flags & (RESTART | QUICK_SAVE | QUICK_LOAD)
+
+
+# Records the input of every simulation step
+class Recorder():
+    def __init__(self, level, seed):
+        self.replay = Replay(level, seed)
+
+    # actions are the RESTART, QUICK_SAVE and QUICK_LOAD flags of what was done since the last step
+    def record(self, controls, actions=0):
+        flags = actions
+        if controls.moving_left:
+            flags |= LEFT
+        if controls.moving_right:
+            flags |= RIGHT
+        if controls.moving_up:
+            flags |= UP
+        if controls.moving_down:
+            flags |= DOWN
+        if controls.fire:
+            flags |= FIRE
+        self.replay.steps.append((flags, controls.mouse_pos[0], controls.mouse_pos[1]))
+
+    # Write the replay, the state of the game is stored to check that a replay ends the same way
+    def save(self, path, game):
+        self.replay.checksum = state_checksum(game)
+        save_replay(path, self.replay)
+
+
+# Do the actions of a replay step, in the order they are done in the game
+def apply_actions(game, actions):
+    if actions & RESTART:
+        game.restart_level()
+    if actions & QUICK_SAVE:
+        game.quick_save()
+    if actions & QUICK_LOAD:
+        game.quick_load()
+
+
+def save_replay(path, replay):
+    with open(path, "wb") as replay_file:
+        replay_file.write(HEADER.pack(MAGIC, VERSION, replay.level, replay.seed, len(replay.steps), replay.checksum))
+        replay_file.write(b"".join(STEP.pack(*step) for step in replay.steps))
+
+
+def load_replay(path):
+    with open(path, "rb") as replay_file:
+        data = replay_file.read()
+    magic, version, level, seed, count, checksum = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a replay file of version {VERSION}")
+    steps = list(STEP.iter_unpack(data[HEADER.size:HEADER.size + count * STEP.size]))
+    return Replay(level, seed, steps, checksum)
+
+
+# Checksum of the level, player and enemies
+def state_checksum(game):
+    state = (game.level, tuple(game.player.rect), game.player.health, game.player.score,
+             [(tuple(enemy.rect), enemy.health) for enemy in game.enemy_list])
+    return zlib.crc32(repr(state).encode())
@@ -0,0 +1,30 @@
+import pygame
+
+# Game timers (animations, cooldowns, stun, hits) read the time from here instead of pygame.time.get_ticks().
+# Normally it is the real time, but a simulation can switch to a fixed time step,
+# then the time only advances when advance() is called once per simulated frame.
+fixed_step = None
+simulated_time = 0
+
+
+def get_ticks():
+    if fixed_step is None:
+        return pygame.time.get_ticks()
+    return simulated_time
+
+
+# Use a simulated time that advances by step milliseconds per frame
+def use_fixed_step(step):
+    global fixed_step, simulated_time
+    fixed_step = step
+    simulated_time = 0
+
+
+def use_real_time():
+    global fixed_step
+    fixed_step = None
+
+
+def advance():
+    global simulated_time
+    simulated_time += fixed_step
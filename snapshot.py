@@ -0,0 +1,39 @@
+import sim_clock
+
+
+# The state of the player, the enemies, the items and the camera of a world at one moment.
+# Restoring it puts the same objects back into that state, nothing is loaded from the level file
+# and no images or rects are created, so it only takes time proportional to the number of characters and items.
+# Timers (animations, cooldowns) are stored relative to the time of the snapshot
+class WorldSnapshot():
+    def __init__(self, world, item_group, camera):
+        self.time = sim_clock.get_ticks()
+        self.characters = [(character, self.character_state(character))
+                           for character in [world.player] + world.character_list]
+        # Items that were not picked up yet
+        self.items = [(item, item.frame_index, item.image, item.update_time - self.time) for item in item_group]
+        self.camera = (camera.offset_x, camera.offset_y)
+
+    def character_state(self, character):
+        return (character.rect.topleft, character.health, character.alive, character.score,
+                character.hit, character.stunned, character.flip, character.running,
+                character.action, character.frame_index, character.image,
+                character.update_time - self.time, character.last_hit - self.time, character.last_attack - self.time)
+
+    def restore(self, item_group, camera):
+        now = sim_clock.get_ticks()
+        for character, state in self.characters:
+            (character.rect.topleft, character.health, character.alive, character.score,
+             character.hit, character.stunned, character.flip, character.running,
+             character.action, character.frame_index, character.image,
+             update_time, last_hit, last_attack) = state
+            character.update_time = now + update_time
+            character.last_hit = now + last_hit
+            character.last_attack = now + last_attack
+        item_group.empty()
+        for item, frame_index, image, update_time in self.items:
+            item.frame_index = frame_index
+            item.image = image
+            item.update_time = now + update_time
+            item_group.add(item)
+        camera.offset_x, camera.offset_y = self.camera
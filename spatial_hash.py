@@ -0,0 +1,126 @@
+import math
+import constants
+
+
+# Buckets of things (with a rect in world coordinates) by the cells of a uniform grid their rect overlaps.
+# A query only looks at the things in the cells around the queried area instead of testing all of them.
+# Things that move are updated with update(), which only touches the buckets if the thing moved to other cells
+class SpatialHash():
+    def __init__(self, cell_size=constants.SPATIAL_HASH_CELL_SIZE):
+        self.cell_size = cell_size
+        # Cell (column, row) -> things overlapping the cell
+        self.cells = {}
+        # Thing -> range of cells (first column, first row, last column, last row) it was added to
+        self.ranges = {}
+
+    def clear(self):
+        self.cells = {}
+        self.ranges = {}
+
+    def insert(self, thing):
+        cell_range = self.cell_range(thing.rect)
+        self.ranges[thing] = cell_range
+        for cell in self.cells_in_range(cell_range):
+            self.cells.setdefault(cell, []).append(thing)
+
+    def remove(self, thing):
+        cell_range = self.ranges.pop(thing, None)
+        if cell_range is None:
+            return
+        for cell in self.cells_in_range(cell_range):
+            bucket = self.cells[cell]
+            bucket.remove(thing)
+            if not bucket:
+                del self.cells[cell]
+
+    # Move the thing to the cells of its current rect
+    def update(self, thing):
+        if self.ranges.get(thing) != self.cell_range(thing.rect):
+            self.remove(thing)
+            self.insert(thing)
+
+    def rebuild(self, things):
+        self.clear()
+        for thing in things:
+            self.insert(thing)
+
+    # Right and bottom of a rect are one pixel outside of it
+    def cell_range(self, rect):
+        size = self.cell_size
+        return rect.left // size, rect.top // size, (rect.right - 1) // size, (rect.bottom - 1) // size
+
+    def cells_in_range(self, cell_range):
+        first_column, first_row, last_column, last_row = cell_range
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                yield column, row
+
+    # Return the things whose rect overlaps the rect, each thing only once
+    def query_rect(self, rect):
+        found = []
+        for cell in self.cells_in_range(self.cell_range(rect)):
+            for thing in self.cells.get(cell, ()):
+                if thing not in found and thing.rect.colliderect(rect):
+                    found.append(thing)
+        return found
+
+    # Return the things whose rect overlaps the circle
+    def query_radius(self, x, y, radius):
+        found = []
+        size = self.cell_size
+        for row in range(int(y - radius) // size, int(y + radius) // size + 1):
+            for column in range(int(x - radius) // size, int(x + radius) // size + 1):
+                for thing in self.cells.get((column, row), ()):
+                    if thing in found:
+                        continue
+                    # Closest point of the rect to the center of the circle
+                    rect = thing.rect
+                    closest_x = min(max(x, rect.left), rect.right)
+                    closest_y = min(max(y, rect.top), rect.bottom)
+                    if (closest_x - x) ** 2 + (closest_y - y) ** 2 <= radius ** 2:
+                        found.append(thing)
+        return found
+
+    # Return the things whose rect the line from start to end goes through, ordered by distance from start
+    def query_segment(self, start, end):
+        x1, y1 = start
+        x2, y2 = end
+        size = self.cell_size
+        column = int(x1 // size)
+        row = int(y1 // size)
+        dx = x2 - x1
+        dy = y2 - y1
+        step_column = 1 if dx > 0 else -1
+        step_row = 1 if dy > 0 else -1
+        # Part of the line (0 to 1) until the next vertical / horizontal cell border, and between two borders
+        if dx != 0:
+            next_x = (column + 1) * size if dx > 0 else column * size
+            border_x = (next_x - x1) / dx
+            cell_x = size / abs(dx)
+        else:
+            border_x = cell_x = math.inf
+        if dy != 0:
+            next_y = (row + 1) * size if dy > 0 else row * size
+            border_y = (next_y - y1) / dy
+            cell_y = size / abs(dy)
+        else:
+            border_y = cell_y = math.inf
+
+        found = []
+        while True:
+            for thing in self.cells.get((column, row), ()):
+                if thing not in found and thing.rect.clipline(start, end):
+                    found.append(thing)
+            # Cross the nearest border, stop when it is past the end of the line
+            if border_x < border_y:
+                if border_x > 1:
+                    break
+                column += step_column
+                border_x += cell_x
+            else:
+                if border_y > 1:
+                    break
+                row += step_row
+                border_y += cell_y
+        found.sort(key=lambda thing: (thing.rect.centerx - x1) ** 2 + (thing.rect.centery - y1) ** 2)
+        return found
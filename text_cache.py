@@ -0,0 +1,22 @@
+from collections import OrderedDict
+
+# Maximum number of cached text images (least recently used ones are removed first)
+MAX_TEXT_IMAGES = 256
+
+# Rendered texts are cached by (text, color, font), so the same text is only rendered once
+text_images = OrderedDict()
+
+
+# Return the image of the text rendered with the font
+def render(font, text, color, antialias=True):
+    key = (text, tuple(color), font, antialias)
+    image = text_images.get(key)
+    if image is None:
+        image = font.render(text, antialias, color)
+        text_images[key] = image
+        if len(text_images) > MAX_TEXT_IMAGES:
+            text_images.popitem(last=False)
+    else:
+        # Mark as recently used
+        text_images.move_to_end(key)
+    return image
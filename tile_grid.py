@@ -0,0 +1,78 @@
+import math
+import constants
+
+
+# Uniform grid of wall tiles keyed by their (column, row) on the map.
+# Instead of testing every wall of the level, a rectangle only has to be
+# tested against the walls in the few cells it overlaps.
+class TileGrid():
+    def __init__(self):
+        self.cells = {}
+
+    def add(self, column, row, tile_data):
+        self.cells[(column, row)] = tile_data
+
+    # Convert a world position to the column and row of the tile under it
+    # Tiles are centered on their coordinates, so shift by half a tile
+    def cell_at(self, x, y):
+        half_tile = constants.TILE_SIZE // 2
+        column = (x + half_tile) // constants.TILE_SIZE
+        row = (y + half_tile) // constants.TILE_SIZE
+        return column, row
+
+    # Return the walls in the cells the rectangle overlaps
+    def query(self, rect):
+        left, top = self.cell_at(rect.left, rect.top)
+        # right and bottom of a rect are one pixel outside of it
+        right, bottom = self.cell_at(rect.right - 1, rect.bottom - 1)
+        walls = []
+        for row in range(top, bottom + 1):
+            for column in range(left, right + 1):
+                tile = self.cells.get((column, row))
+                if tile:
+                    walls.append(tile)
+        return walls
+
+    # Return the first wall on the line from (x1, y1) to (x2, y2), None if the line does not hit a wall.
+    # Every cell the line passes through is tested in order, so fast things can't jump over a wall
+    def raycast(self, x1, y1, x2, y2):
+        size = constants.TILE_SIZE
+        # Tiles are centered on their coordinates, shift by half a tile so cell borders are at multiples of size
+        half_tile = size // 2
+        x1 += half_tile
+        y1 += half_tile
+        dx = x2 + half_tile - x1
+        dy = y2 + half_tile - y1
+        column = int(x1 // size)
+        row = int(y1 // size)
+        step_column = 1 if dx > 0 else -1
+        step_row = 1 if dy > 0 else -1
+        # Part of the line (0 to 1) until the next vertical / horizontal cell border, and between two borders
+        if dx != 0:
+            next_x = (column + 1) * size if dx > 0 else column * size
+            border_x = (next_x - x1) / dx
+            cell_x = size / abs(dx)
+        else:
+            border_x = cell_x = math.inf
+        if dy != 0:
+            next_y = (row + 1) * size if dy > 0 else row * size
+            border_y = (next_y - y1) / dy
+            cell_y = size / abs(dy)
+        else:
+            border_y = cell_y = math.inf
+
+        while True:
+            wall = self.cells.get((column, row))
+            if wall:
+                return wall
+            # Cross the nearest border, stop when it is past the end of the line
+            if border_x < border_y:
+                if border_x > 1:
+                    return None
+                column += step_column
+                border_x += cell_x
+            else:
+                if border_y > 1:
+                    return None
+                row += step_row
+                border_y += cell_y
@@ -0,0 +1,43 @@
+from collections import OrderedDict
+import pygame
+
+# Rotated images are cached for angles in steps of ANGLE_STEP degrees
+ANGLE_STEP = 2
+# Maximum number of cached rotated images (least recently used ones are removed first)
+MAX_ROTATED_IMAGES = 1024
+
+# Flipped and rotated versions of images are created once and reused,
+# instead of creating new surfaces with pygame.transform every frame
+flipped_images = {}
+rotated_images = OrderedDict()
+
+
+# Return the image flipped in x and/or y axis
+# There are only a few images to flip (animation frames), so every flipped image is kept
+def flip(image, flip_x, flip_y=False):
+    if not flip_x and not flip_y:
+        return image
+    key = (image, flip_x, flip_y)
+    flipped_image = flipped_images.get(key)
+    if flipped_image is None:
+        flipped_image = pygame.transform.flip(image, flip_x, flip_y)
+        flipped_images[key] = flipped_image
+    return flipped_image
+
+
+# Return the image rotated by the angle (rounded to ANGLE_STEP degrees), then flipped
+def rotate(image, angle, flip_x=False, flip_y=False):
+    angle = round(angle / ANGLE_STEP) * ANGLE_STEP % 360
+    key = (image, angle, flip_x, flip_y)
+    rotated_image = rotated_images.get(key)
+    if rotated_image is None:
+        rotated_image = pygame.transform.rotate(image, angle)
+        if flip_x or flip_y:
+            rotated_image = pygame.transform.flip(rotated_image, flip_x, flip_y)
+        rotated_images[key] = rotated_image
+        if len(rotated_images) > MAX_ROTATED_IMAGES:
+            rotated_images.popitem(last=False)
+    else:
+        # Mark as recently used
+        rotated_images.move_to_end(key)
+    return rotated_image
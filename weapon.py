@@ -1,27 +1,31 @@
-import pygame.transform
 import constants
 import math
-import random
+import transform_cache
+import sim_clock
 
 
 class Weapon():
-    def __init__(self, image, arrow_image):
+    # Rapid fire keeps shooting while the mouse button is held, piercing arrows fly through enemies
+    def __init__(self, image, rapid_fire=False, piercing=False):
         self.original_image = image
         # We will be rotating the bow image around the player
         self.angle = 0
-        self.image = pygame.transform.rotate(self.original_image, self.angle)
+        self.image = transform_cache.rotate(self.original_image, self.angle)
         self.rect = self.image.get_rect()
-        self.arrow_image = arrow_image
+        self.rapid_fire = rapid_fire
+        self.piercing = piercing
         self.fired = False  # Holding the mouse 1 won't fire continuously
-        self.last_shot = pygame.time.get_ticks()
+        self.last_shot = sim_clock.get_ticks()
 
-    def update(self, player):
+    # mouse_pos is the mouse position on screen, fire is True while the left mouse button is held.
+    # Arrows are taken from the pool of the projectile manager
+    def update(self, player, camera, mouse_pos, fire, projectiles):
         shot_cooldown = 100  # Fire cooldown of bow
         arrow = None  # In case the user did not create an arrow, return none
 
         self.rect.center = player.rect.center
-        # Get mouse position on screen
-        pos = pygame.mouse.get_pos()
+        # Convert mouse position on screen to world coordinates
+        pos = camera.to_world(*mouse_pos)
         # pos[0] is the x-axis, pos[1] is y-axis
         x_dist = pos[0] - self.rect.centerx
         y_dist = -(pos[1] - self.rect.centery)  # Y coordinates increase down the screen
@@ -29,112 +33,144 @@ class Weapon():
         self.angle = math.degrees(math.atan2(y_dist, x_dist))
 
         # Create arrows from bow
-        # Get mouse click, 0 is left click, 1 is middle, 2 is right click
-        if pygame.mouse.get_pressed()[0] and self.fired == False and (
-                pygame.time.get_ticks() - self.last_shot >= shot_cooldown):
-            arrow = Arrow(self.arrow_image, self.rect.centerx, self.rect.centery, self.angle)
-            self.fired = True  # Set this to False for rapid fire
-            self.last_shot = pygame.time.get_ticks()  # set last shot time
+        if fire and self.fired == False and (
+                sim_clock.get_ticks() - self.last_shot >= shot_cooldown):
+            arrow = projectiles.shoot_arrow(self.rect.centerx, self.rect.centery, self.angle, self.piercing)
+            self.fired = not self.rapid_fire
+            self.last_shot = sim_clock.get_ticks()  # set last shot time
         # Reset mouse click to be able to fire again
-        if not pygame.mouse.get_pressed()[0]:
+        if not fire:
             self.fired = False
         return arrow
 
-    def draw(self, surface):
-        self.image = pygame.transform.rotate(self.original_image, self.angle)
+    def draw(self, surface, camera):
+        self.image = transform_cache.rotate(self.original_image, self.angle)
+        center_x, center_y = camera.to_screen(self.rect.centerx, self.rect.centery)
         # The bow does not rotate when it is centered to the player rectangle.
         # Adjust it's center by offsetting it
         surface.blit(self.image,
-                     ((self.rect.centerx - int(self.image.get_width() / 2)),
-                      self.rect.centery - int(self.image.get_height() / 2)))
+                     ((center_x - int(self.image.get_width() / 2)),
+                      center_y - int(self.image.get_height() / 2)))
 
 
-# Inherit from Sprite for more functionality such as multiple arrows with sprite groups, and kill()
-class Arrow(pygame.sprite.Sprite):
-    def __init__(self, image, x, y, angle):
-        pygame.sprite.Sprite.__init__(self)
+# Arrows are reused by the projectile pool (see projectiles.py), launch() resets an arrow for a new shot
+class Arrow():
+    def __init__(self, image):
         self.original_image = image
+        self.image = image
+        self.rect = image.get_rect()
+        # Distance from the center of the arrow to its tip (the original sprite points up)
+        self.tip = image.get_height() / 2
+        self.alive = False
+        # Piercing arrows fly through enemies, each enemy is only hit once
+        self.piercing = False
+        self.hit_enemies = []
+
+    def launch(self, x, y, angle, piercing=False):
         self.angle = angle
         # Subtract 90 bcs original sprite image is rotated
-        self.image = pygame.transform.rotate(self.original_image, self.angle - 90)
+        self.image = transform_cache.rotate(self.original_image, self.angle - 90)
         self.rect = self.image.get_rect()
         self.rect.center = (x, y)
         # Calculate horizontal and vertical speeds basen on angle
         self.dx = math.cos(math.radians(self.angle)) * constants.ARROW_SPEED
         self.dy = -(math.sin(math.radians(self.angle)) * constants.ARROW_SPEED)  # Negative bcs pygame Y coordinates
+        self.alive = True
+        self.piercing = piercing
+        self.hit_enemies.clear()
 
-    # Update arrow and return the dealt damage if it hit an enemy
-    def update(self, screen_scroll, obstacle_tiles, enemy_list):
+    # Update arrow and return the dealt damage if it hit an enemy, rng is the random generator of the game
+    def update(self, wall_grid, characters, camera, rng):
         # Reset variables
         damage = 0
         damage_pos = None
 
         # Reposition based on speed
-        self.rect.x += screen_scroll[0] + self.dx
-        self.rect.y += screen_scroll[1] + self.dy
-
-        # Check for collision between arrow and tile walls
-        for obstacle in obstacle_tiles:
-            if obstacle[1].colliderect(self.rect):
-                self.kill()
-
-        # Check if arrow has gone off-screen to remove arrow from game
-        if self.rect.right < 0 or self.rect.left > constants.SCREEN_WIDTH or \
-                self.rect.bottom < 0 or self.rect.top > constants.SCREEN_HEIGHT:
-            self.kill()
-
-        # Check arrow collision with enemies
-        for enemy in enemy_list:
-            if enemy.rect.colliderect(self.rect) and enemy.alive:
-                damage = 10 + random.randint(-5, 5)  # Random damage
+        old_rect = self.rect.copy()
+        self.rect.x += self.dx
+        self.rect.y += self.dy
+
+        # Check arrow collision with enemies on the path of the arrow in this frame (closest first) and at its new position
+        hit_candidates = characters.query_segment(old_rect.center, self.rect.center) + characters.query_rect(self.rect)
+        for enemy in hit_candidates:
+            # The player (char_type 0) is in the spatial hash too
+            if enemy.char_type != 0 and enemy.alive and enemy not in self.hit_enemies:
+                damage = 10 + rng.randint(-5, 5)  # Random damage
                 damage_pos = enemy.rect  # Damage display is positioned at the enemy rectange
                 enemy.health -= damage
                 enemy.hit = True
-                self.kill()  # Destroy arrow after hitting the first enemy
+                self.hit_enemies.append(enemy)
+                if not self.piercing:
+                    self.alive = False  # Destroy arrow after hitting the first enemy
                 break
 
+        # Check for collision between the tip of the arrow and tile walls on the way from the old position
+        # (not only at the new position, so fast arrows can't fly through a wall)
+        speed = math.hypot(self.dx, self.dy)
+        if speed:
+            tip_x = self.rect.centerx + self.dx / speed * self.tip
+            tip_y = self.rect.centery + self.dy / speed * self.tip
+            if wall_grid.raycast(old_rect.centerx, old_rect.centery, tip_x, tip_y):
+                self.alive = False
+
+        # Check if arrow has gone off-screen to remove arrow from game
+        if not self.rect.colliderect(camera.rect):
+            self.alive = False
+
         return damage, damage_pos
 
-    def draw(self, surface):
+    def draw(self, surface, camera):
+        center_x, center_y = camera.to_screen(self.rect.centerx, self.rect.centery)
         surface.blit(self.image,
-                     ((self.rect.centerx - int(self.image.get_width() / 2)),
-                      self.rect.centery - int(self.image.get_height() / 2)))
+                     ((center_x - int(self.image.get_width() / 2)),
+                      center_y - int(self.image.get_height() / 2)))
 
 
-class Fireball(pygame.sprite.Sprite):
-    def __init__(self, image, x, y, target_x, target_y):
-        pygame.sprite.Sprite.__init__(self)
+# Fireballs are reused by the projectile pool like arrows
+class Fireball():
+    def __init__(self, image):
         self.original_image = image
+        self.image = image
+        self.rect = image.get_rect()
+        # The fireball is round, the rect of the rotated image is bigger than the fireball
+        self.radius = min(image.get_size()) / 2
+        self.alive = False
+
+    def launch(self, x, y, target_x, target_y):
         x_dist = target_x - x
         y_dist = -(target_y - y)
         self.angle = math.degrees(math.atan2(y_dist, x_dist))
         # Subtract 90 bcs original sprite image is rotated
-        self.image = pygame.transform.rotate(self.original_image, self.angle - 90)
+        self.image = transform_cache.rotate(self.original_image, self.angle - 90)
         self.rect = self.image.get_rect()
         self.rect.center = (x, y)
         # Calculate horizontal and vertical speeds basen on angle
         self.dx = math.cos(math.radians(self.angle)) * constants.FIREBALL_SPEED
         self.dy = -(math.sin(math.radians(self.angle)) * constants.FIREBALL_SPEED)  # Negative bcs pygame Y coordinates
+        self.alive = True
 
-    # Update arrow and return the dealt damage if it hit an enemy
-    def update(self, screen_scroll, player):
+    # Move the fireball and hit the player (fireballs fly through walls)
+    def update(self, player, camera):
         # Reposition fireball based on speed
-        self.rect.x += screen_scroll[0] + self.dx
-        self.rect.y += screen_scroll[1] + self.dy
+        self.rect.x += self.dx
+        self.rect.y += self.dy
 
         # Check if fireball has gone off-screen to remove it from game
-        if self.rect.right < 0 or self.rect.left > constants.SCREEN_WIDTH or \
-                self.rect.bottom < 0 or self.rect.top > constants.SCREEN_HEIGHT:
-            self.kill()
-
-        # Check fireball collision with player
-        if player.rect.colliderect(self.rect) and not player.hit:
-            player.hit = True
-            player.last_hit = pygame.time.get_ticks()
-            player.health -= 10
-            self.kill()
-
-    def draw(self, surface):
+        if not self.rect.colliderect(camera.rect):
+            self.alive = False
+
+        # Check fireball collision with player (closest point of the player rect to the center of the fireball)
+        if not player.hit:
+            closest_x = min(max(self.rect.centerx, player.rect.left), player.rect.right)
+            closest_y = min(max(self.rect.centery, player.rect.top), player.rect.bottom)
+            if (closest_x - self.rect.centerx) ** 2 + (closest_y - self.rect.centery) ** 2 <= self.radius ** 2:
+                player.hit = True
+                player.last_hit = sim_clock.get_ticks()
+                player.health -= 10
+                self.alive = False
+
+    def draw(self, surface, camera):
+        center_x, center_y = camera.to_screen(self.rect.centerx, self.rect.centery)
         surface.blit(self.image,
-                     ((self.rect.centerx - int(self.image.get_width() / 2)),
-                      self.rect.centery - int(self.image.get_height() / 2)))
\ No newline at end of file
+                     ((center_x - int(self.image.get_width() / 2)),
+                      center_y - int(self.image.get_height() / 2)))
\ No newline at end of file
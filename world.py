@@ -1,79 +1,110 @@
 import constants
 from items import Item
 from character import Character
+from tile_grid import TileGrid
+from line_of_sight import LineOfSight
+from flow_field import FlowField
+from chunk_cache import ChunkCache
 
 
 class World():
     def __init__(self):
-        self.map_tiles = []
-        self.obstacle_tiles = []
+        # Map tiles by row and column (None is an empty tile), used to only draw the tiles on the screen
+        self.tile_map = []
+        # Walls indexed by their tile position for fast collision checks
+        self.wall_grid = TileGrid()
+        # Wall bitmap for enemy line of sight checks
+        self.line_of_sight = LineOfSight()
+        # Paths around walls towards the player for enemies that can't see the player
+        self.flow_field = FlowField()
+        # Distances to the exit of the level (level_loader.Level), bots follow them to the exit
+        self.navigation = None
         self.exit_tile = None
         self.item_list = []
         self.player = None
         self.character_list = []
+        # Pre-rendered chunks of the static tile layer
+        self.chunk_cache = ChunkCache(self)
 
-    def process_data(self, data, tile_list, item_images, mob_animations):
-        self.level_length = len(data)
-        # Iterate through each value in level data file
-        # While iterating through, to also keep record of the index and count it, use enumerate
-        for y, row in enumerate(data):
-            for x, tile in enumerate(row):
-                image = tile_list[tile]
-                image_rect = image.get_rect()
-                image_x = x * constants.TILE_SIZE
-                image_y = y * constants.TILE_SIZE
-                # image_rect.x = image_x
-                # image_rect.y = image_y
-                image_rect.center = (image_x, image_y)
-                tile_data = [image, image_rect, image_x, image_y]
+    # level is a level_loader.Level, its wall bitmaps and spawn table are computed when the level is compiled
+    def process_data(self, level, tile_list, item_images, mob_animations):
+        self.level_length = level.rows
+        self.navigation = level
+        # The bitmaps of the level are used as they are
+        self.line_of_sight = LineOfSight(level.columns, level.rows, level.walls)
+        self.flow_field = FlowField(level.columns, level.rows, walls=level.blocked)
+        self.tile_map = [[None] * level.columns for row in range(level.rows)]
+        # Iterate through each tile of the level, -1 means empty tile
+        for index, tile in enumerate(level.tiles):
+            if tile < 0:
+                continue
+            x = index % level.columns
+            y = index // level.columns
+            image = tile_list[tile]
+            image_rect = image.get_rect()
+            image_x = x * constants.TILE_SIZE
+            image_y = y * constants.TILE_SIZE
+            # image_rect.x = image_x
+            # image_rect.y = image_y
+            image_rect.center = (image_x, image_y)
+            tile_data = [image, image_rect, image_x, image_y]
 
-                # 7th png is a wall with collision
-                if tile == 7:
-                    self.obstacle_tiles.append(tile_data)
-                # 8th png is a door between levels
-                elif tile == 8:
-                    self.exit_tile = tile_data
-                # Coin placement (Type 0, image index 0)
-                elif tile == 9:
-                    coin = Item(image_x, image_y, 0, item_images[0])
-                    self.item_list.append(coin)
-                    # After adding the coin on the map, override the huge coin tile image with empty floor image
-                    tile_data[0] = tile_list[0]
-                # Potion placement (Type 1, image index 1)
-                elif tile == 10:
-                    # wrap item image in list bcs parameter accepts anim list
-                    potion = Item(image_x, image_y, 1, [item_images[1]])
-                    self.item_list.append(potion)
-                    # Replace floor tile
-                    tile_data[0] = tile_list[0]
-                # Character placement
-                elif tile == 11:
-                    player = Character(image_x, image_y, 100, mob_animations, 0, False, 1)  # 0: elf
-                    self.player = player
-                    tile_data[0] = tile_list[0]
-                # Enemy placements (enemies are in between 12 and 17.png)
-                elif 12 <= tile <= 16:
-                    enemy = Character(image_x, image_y, 100, mob_animations, tile - 11, False, 1)
-                    self.character_list.append(enemy)
-                    tile_data[0] = tile_list[0]
-                # Boss placement
-                elif tile == 17:
-                    enemy = Character(image_x, image_y, 400, mob_animations, 6, True, 2)
-                    self.character_list.append(enemy)
-                    tile_data[0] = tile_list[0]
+            # 7th png is a wall with collision
+            if tile == 7:
+                self.wall_grid.add(x, y, tile_data)
+            # 8th png is a door between levels
+            elif tile == 8:
+                self.exit_tile = tile_data
+            # Items and characters (9 - 17) are placed on an empty floor tile
+            elif tile >= 9:
+                tile_data[0] = tile_list[0]
 
-                # Add image data to main tiles list (-1 means empty tile)
-                if tile >= 0:
-                    self.map_tiles.append(tile_data)
+            self.tile_map[y][x] = tile_data
 
-    def update(self, screen_scroll):
-        # Update each map tile
-        for tile in self.map_tiles:
-            # Shift coordinates
-            tile[2] += screen_scroll[0]  # X coordinate
-            tile[3] += screen_scroll[1]  # Y coordinate
-            tile[1].center = (tile[2], tile[3])  # image_rect of tile_data
+        # Create items and characters from the spawn table of the level
+        for tile, x, y in level.spawns:
+            image_x = x * constants.TILE_SIZE
+            image_y = y * constants.TILE_SIZE
+            # Coin placement (Type 0, image index 0)
+            if tile == 9:
+                coin = Item(image_x, image_y, 0, item_images[0])
+                self.item_list.append(coin)
+            # Potion placement (Type 1, image index 1)
+            elif tile == 10:
+                # wrap item image in list bcs parameter accepts anim list
+                potion = Item(image_x, image_y, 1, [item_images[1]])
+                self.item_list.append(potion)
+            # Character placement
+            elif tile == 11:
+                player = Character(image_x, image_y, 100, mob_animations, 0, False, 1)  # 0: elf
+                self.player = player
+            # Enemy placements (enemies are in between 12 and 17.png)
+            elif 12 <= tile <= 16:
+                enemy = Character(image_x, image_y, 100, mob_animations, tile - 11, False, 1)
+                self.character_list.append(enemy)
+            # Boss placement
+            elif tile == 17:
+                enemy = Character(image_x, image_y, 400, mob_animations, 6, True, 2)
+                self.character_list.append(enemy)
 
-    def draw(self, surface):
-        for tile in self.map_tiles:
-            surface.blit(tile[0], tile[1])
+    # Return the tiles that intersect the given rect
+    # The row and column range is computed directly from the tile grid
+    def visible_tiles(self, rect):
+        first_column, first_row = self.wall_grid.cell_at(rect.left, rect.top)
+        last_column, last_row = self.wall_grid.cell_at(rect.right - 1, rect.bottom - 1)
+        # Keep the range on the map, a rect outside of the map has no tiles
+        first_row = max(first_row, 0)
+        first_column = max(first_column, 0)
+        last_row = min(last_row, len(self.tile_map) - 1)
+        last_column = min(last_column, len(self.tile_map[0]) - 1 if self.tile_map else -1)
+        if last_row < first_row or last_column < first_column:
+            return []
+        tiles = []
+        for row in self.tile_map[first_row:last_row + 1]:
+            for tile in row[first_column:last_column + 1]:
+                if tile:
+                    tiles.append(tile)
+        return tiles
+
+    def draw(self, surface, camera):
+        return self.chunk_cache.draw(surface, camera)